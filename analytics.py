@@ -0,0 +1,261 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from database import Database, after_fork
+
+db = Database()
+
+MAX_SNAPSHOT_AGE_SECONDS = 300
+# Rows modified shortly before the last resync are read again, covering transactions that committed after it started
+RESYNC_OVERLAP_SECONDS = 60
+
+REPORTS = ('load_factor', 'revenue_by_month', 'cancellation_rates', 'crew_utilization')
+
+CABINS = {'Economy': 0, 'Business': 1}
+CABIN_NAMES = ['Economy', 'Business']
+STATUSES = {'Confirmed': 0, 'Completed': 1, 'Cancelled_Client': 2, 'Cancelled_System': 3}
+ACTIVE_STATUSES = [STATUSES['Confirmed'], STATUSES['Completed']]
+ROLES = {'pilot': 0, 'attendant': 1}
+
+def _cabin(value):
+    return CABINS.get((value or "").strip().capitalize(), 0)
+
+def _locate(ids, keys):
+    """Positions of keys in a sorted ID column, with a mask of the keys actually present"""
+    pos = np.searchsorted(ids, keys)
+    if not len(ids):
+        return pos, np.zeros(len(keys), bool)
+    clipped = np.minimum(pos, len(ids) - 1)
+    return clipped, ids[clipped] == keys
+
+class AnalyticsSnapshot:
+    """Columnar NumPy copy of flights, tickets, bookings, cabin capacity and crew assignments; loaded once, then extended by ID watermarks and patched for flights and bookings reported by change events"""
+    def __init__(self, max_age=MAX_SNAPSHOT_AGE_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._dirty_lock = threading.Lock()
+        self._dirty_flights = set()
+        self._dirty_bookings = set()
+        self._loaded = False
+        self.refreshed_at = None
+        self._refreshed_monotonic = 0.0
+        self._changed_since = None
+
+        self.f_id = np.empty(0, np.int64)
+        self.f_route = np.empty(0, np.int64)
+        self.f_plane = np.empty(0, np.int64)
+        self.f_dep = np.empty(0, 'datetime64[m]')
+        self.f_minutes = np.empty(0, np.float64)
+        self.f_cancelled = np.empty(0, bool)
+
+        self.b_id = np.empty(0, np.int64)
+        self.b_month = np.empty(0, 'datetime64[M]')
+        self.b_status = np.empty(0, np.int8)
+        self.b_price = np.empty(0, np.float64)
+
+        self.t_booking = np.empty(0, np.int64)
+        self.t_flight = np.empty(0, np.int64)
+        self.t_cabin = np.empty(0, np.int8)
+
+        self.c_role = np.empty(0, np.int8)
+        self.c_worker = np.empty(0, np.int64)
+        self.c_flight = np.empty(0, np.int64)
+
+        self.routes = {}
+        self.plane_codes = {}
+        self.worker_ids = []
+        self._worker_codes = {}
+        self.capacity = np.zeros((0, 2), np.int64)
+
+    # --- Loading ---
+
+    def on_change(self, event, ids):
+        with self._dirty_lock:
+            if event.startswith('flight_'):
+                self._dirty_flights.update(int(i) for i in ids)
+            elif event.startswith('booking_'):
+                self._dirty_bookings.update(int(i) for i in ids)
+
+    def _plane_code(self, plane_id):
+        return self.plane_codes.setdefault(str(plane_id), len(self.plane_codes))
+
+    def _worker_code(self, role, worker_id):
+        key = (role, str(worker_id))
+        if key not in self._worker_codes:
+            self._worker_codes[key] = len(self.worker_ids)
+            self.worker_ids.append(key)
+        return self._worker_codes[key]
+
+    def _flight_columns(self, rows):
+        return (np.array([r[0] for r in rows], np.int64),
+                np.array([r[1] for r in rows], np.int64),
+                np.array([self._plane_code(r[2]) for r in rows], np.int64),
+                np.array([r[3] for r in rows], 'datetime64[m]'),
+                np.array([r[4] for r in rows], np.float64),
+                np.array([bool(r[5]) for r in rows], bool))
+
+    def _booking_columns(self, rows):
+        return (np.array([r[0] for r in rows], np.int64),
+                np.array([r[1] for r in rows], 'datetime64[M]'),
+                np.array([STATUSES.get(r[2], 0) for r in rows], np.int8),
+                np.array([float(r[3] or 0) for r in rows], np.float64))
+
+    def _patch(self, ids, new_ids, columns, values):
+        """Overwrites rows of sorted-ID columns in place for IDs already present in the snapshot"""
+        pos, found = _locate(ids, new_ids)
+        for column, value in zip(columns, values):
+            column[pos[found]] = value[found]
+
+    def _resync_changed(self):
+        """Re-reads the columns that change after insert (flight cancelled, booking status and price) for rows modified since the last resync"""
+        clock = db.get_report_clock()
+        since = self._changed_since - timedelta(seconds=RESYNC_OVERLAP_SECONDS)
+        rows = db.get_report_flight_states(since)
+        self._patch(self.f_id, np.array([r[0] for r in rows], np.int64), (self.f_cancelled,),
+                    (np.array([bool(r[1]) for r in rows], bool),))
+        rows = db.get_report_booking_states(since)
+        self._patch(self.b_id, np.array([r[0] for r in rows], np.int64), (self.b_status, self.b_price),
+                    (np.array([STATUSES.get(r[1], 0) for r in rows], np.int8),
+                     np.array([float(r[2] or 0) for r in rows], np.float64)))
+        self._changed_since = clock
+
+    def refresh(self, force=False):
+        """Brings the snapshot up to date: appends rows past the watermarks and re-reads only flights and bookings flagged by change events; once max_age has passed it also re-reads the mutable columns of rows modified since the last resync, picking up changes made by other processes"""
+        with self._lock:
+            expired = time.monotonic() - self._refreshed_monotonic >= self.max_age
+            with self._dirty_lock:
+                if self._loaded and not force and not expired and not self._dirty_flights and not self._dirty_bookings:
+                    return
+                dirty_flights, self._dirty_flights = self._dirty_flights, set()
+                dirty_bookings, self._dirty_bookings = self._dirty_bookings, set()
+
+            if not self._loaded:
+                self._changed_since = db.get_report_clock()
+            elif expired or force:
+                self._resync_changed()
+
+            self.routes = {r[0]: (r[1], r[2]) for r in db.get_report_routes()}
+            capacity_rows = db.get_report_capacity()
+            for plane_id, _, _ in capacity_rows:
+                self._plane_code(plane_id)
+
+            last_flight = int(self.f_id[-1]) if len(self.f_id) else 0
+            flight_rows = db.get_report_flights(since_id=last_flight)
+            if flight_rows:
+                cols = self._flight_columns(flight_rows)
+                self.f_id, self.f_route, self.f_plane, self.f_dep, self.f_minutes, self.f_cancelled = [
+                    np.concatenate([old, new]) for old, new in
+                    zip((self.f_id, self.f_route, self.f_plane, self.f_dep, self.f_minutes, self.f_cancelled), cols)]
+                crew_rows = db.get_report_crew(last_flight, int(self.f_id[-1]))
+                self.c_role = np.concatenate([self.c_role, np.array([ROLES[r[0]] for r in crew_rows], np.int8)])
+                self.c_worker = np.concatenate([self.c_worker, np.array([self._worker_code(r[0], r[1]) for r in crew_rows], np.int64)])
+                self.c_flight = np.concatenate([self.c_flight, np.array([r[2] for r in crew_rows], np.int64)])
+
+            self.capacity = np.zeros((len(self.plane_codes), 2), np.int64)
+            for plane_id, class_type, seats in capacity_rows:
+                self.capacity[self.plane_codes[str(plane_id)], _cabin(class_type)] = int(seats)
+
+            stale_flights = sorted(dirty_flights - set(int(r[0]) for r in flight_rows))
+            if stale_flights:
+                cols = self._flight_columns(db.get_report_flights(flight_ids=stale_flights))
+                self._patch(self.f_id, cols[0], (self.f_cancelled,), (cols[5],))
+                dirty_bookings.update(int(r[0]) for r in db.get_report_bookings(flight_ids=stale_flights))
+
+            last_booking = int(self.b_id[-1]) if len(self.b_id) else 0
+            booking_rows = db.get_report_bookings(since_id=last_booking)
+            if booking_rows:
+                cols = self._booking_columns(booking_rows)
+                self.b_id, self.b_month, self.b_status, self.b_price = [
+                    np.concatenate([old, new]) for old, new in
+                    zip((self.b_id, self.b_month, self.b_status, self.b_price), cols)]
+                ticket_rows = db.get_report_tickets(last_booking, int(self.b_id[-1]))
+                self.t_booking = np.concatenate([self.t_booking, np.array([r[0] for r in ticket_rows], np.int64)])
+                self.t_flight = np.concatenate([self.t_flight, np.array([r[1] for r in ticket_rows], np.int64)])
+                self.t_cabin = np.concatenate([self.t_cabin, np.array([_cabin(r[2]) for r in ticket_rows], np.int8)])
+
+            stale_bookings = sorted(dirty_bookings - set(int(r[0]) for r in booking_rows))
+            if stale_bookings:
+                cols = self._booking_columns(db.get_report_bookings(booking_ids=stale_bookings))
+                self._patch(self.b_id, cols[0], (self.b_status, self.b_price), (cols[2], cols[3]))
+
+            self._loaded = True
+            self.refreshed_at = datetime.now()
+            self._refreshed_monotonic = time.monotonic()
+
+    # --- Reports ---
+
+    def _route_label(self, route_id):
+        origin, dest = self.routes.get(int(route_id), ('?', '?'))
+        return f"{origin}-{dest}"
+
+    def load_factor(self):
+        """Sold seats over offered seats per route and cabin, for non-cancelled flights"""
+        live = ~self.f_cancelled
+        route_ids, route_idx = np.unique(self.f_route, return_inverse=True)
+        n = len(route_ids)
+
+        offered = np.zeros((n, 2))
+        for cabin in (0, 1):
+            offered[:, cabin] = np.bincount(route_idx[live], weights=self.capacity[self.f_plane[live], cabin], minlength=n)
+
+        b_pos, b_found = _locate(self.b_id, self.t_booking)
+        f_pos, f_found = _locate(self.f_id, self.t_flight)
+        valid = b_found & f_found
+        b_pos, f_pos, cabins = b_pos[valid], f_pos[valid], self.t_cabin[valid]
+        sold_mask = np.isin(self.b_status[b_pos], ACTIVE_STATUSES) & live[f_pos]
+        sold = np.bincount(route_idx[f_pos[sold_mask]] * 2 + cabins[sold_mask], minlength=n * 2).reshape(n, 2)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factor = np.where(offered > 0, sold / offered, 0.0)
+        return [{'route_id': int(route_ids[i]), 'route': self._route_label(route_ids[i]), 'cabin': CABIN_NAMES[c],
+                 'seats_sold': int(sold[i, c]), 'seats_offered': int(offered[i, c]),
+                 'load_factor': round(float(factor[i, c]), 4)}
+                for i in range(n) for c in (0, 1) if offered[i, c] > 0]
+
+    def revenue_by_month(self):
+        """Booking revenue per booking month; system-cancelled bookings are refunded and excluded"""
+        mask = self.b_status != STATUSES['Cancelled_System']
+        months, idx = np.unique(self.b_month[mask], return_inverse=True)
+        revenue = np.bincount(idx, weights=self.b_price[mask], minlength=len(months))
+        counts = np.bincount(idx, minlength=len(months))
+        return [{'month': str(m), 'revenue': round(float(r), 2), 'bookings': int(c)}
+                for m, r, c in zip(months, revenue, counts)]
+
+    def cancellation_rates(self):
+        """Share of cancelled flights per route"""
+        route_ids, idx = np.unique(self.f_route, return_inverse=True)
+        total = np.bincount(idx, minlength=len(route_ids))
+        cancelled = np.bincount(idx, weights=self.f_cancelled, minlength=len(route_ids))
+        return [{'route_id': int(r), 'route': self._route_label(r), 'flights': int(t),
+                 'cancelled': int(c), 'cancellation_rate': round(float(c / t), 4) if t else 0.0}
+                for r, t, c in zip(route_ids, total, cancelled)]
+
+    def crew_utilization(self, days=30):
+        """Flights and block hours per crew member over the last `days` days of non-cancelled flights"""
+        now = np.datetime64(datetime.now(), 'm')
+        start = np.datetime64(datetime.now() - timedelta(days=days), 'm')
+        f_pos, valid = _locate(self.f_id, self.c_flight)
+        f_pos, workers = f_pos[valid], self.c_worker[valid]
+        mask = ~self.f_cancelled[f_pos] & (self.f_dep[f_pos] >= start) & (self.f_dep[f_pos] < now)
+        n = len(self.worker_ids)
+        flights = np.bincount(workers[mask], minlength=n)
+        hours = np.bincount(workers[mask], weights=self.f_minutes[f_pos[mask]] / 60.0, minlength=n)
+        order = np.argsort(-hours)
+        return [{'role': self.worker_ids[i][0], 'id_worker': self.worker_ids[i][1],
+                 'flights': int(flights[i]), 'block_hours': round(float(hours[i]), 1),
+                 'utilization': round(float(hours[i]) / (days * 24), 4)}
+                for i in order if flights[i] > 0]
+
+    def report(self, name, **kwargs):
+        if name not in REPORTS:
+            raise ValueError(f"Unknown report: {name}")
+        self.refresh()
+        with self._lock:
+            return {'report': name, 'snapshot_time': self.refreshed_at.strftime('%Y-%m-%d %H:%M:%S'),
+                    'rows': getattr(self, name)(**kwargs)}
+
+analytics = AnalyticsSnapshot()
+db.add_change_listener(analytics.on_change)
+# A forked worker starts with an empty snapshot and fresh locks and builds its own on first use
+after_fork(analytics.__init__)
@@ -0,0 +1,85 @@
+import bisect
+import threading
+import time
+import mysql.connector
+from database import Database, after_fork
+from resilience import CircuitBreaker, CircuitOpenError
+
+db = Database()
+
+MAX_INDEX_AGE_SECONDS = 600
+
+class DestinationIndex:
+    """Sorted-prefix index over airport city, country, airport name and code, so each keystroke is answered with a bisect instead of a query; rebuilt once older than max_age seconds"""
+    def __init__(self, max_age=MAX_INDEX_AGE_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._keys = []       # sorted [(normalized_term, entry_position)]
+        self._entries = []
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._breaker = CircuitBreaker('destinations', failures=(mysql.connector.Error,))
+
+    @staticmethod
+    def _normalize(text):
+        return " ".join(str(text or "").lower().split())
+
+    def rebuild(self):
+        """Reloads the airports and rebuilds the index, indexing every field and every word inside multi-word names"""
+        entries = db.get_all_destinations()
+        keys = []
+        for pos, e in enumerate(entries):
+            terms = set()
+            for field in ('city', 'country', 'airport_name', 'airport_code'):
+                value = self._normalize(e.get(field))
+                if value:
+                    terms.add(value)
+                    terms.update(value.split())
+            keys.extend((term, pos) for term in terms)
+        keys.sort()
+        with self._lock:
+            self._entries = entries
+            self._keys = keys
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        """Builds the index on first use and rebuilds it once expired; returns False only when there is no index to answer from"""
+        if self._loaded and time.monotonic() - self._loaded_at < self.max_age:
+            return True
+        # One thread rebuilds; once an index exists the others keep answering from it meanwhile
+        if not self._reload_lock.acquire(blocking=not self._loaded):
+            return True
+        try:
+            if self._loaded and time.monotonic() - self._loaded_at < self.max_age:
+                return True
+            self._breaker.call(self.rebuild)
+        except (CircuitOpenError, mysql.connector.Error) as e:
+            if not self._loaded:
+                print(f"Destination index unavailable: {e}")
+                return False
+            print(f"Destination index rebuild failed, keeping the current one: {e}")
+            self._loaded_at = time.monotonic()
+        finally:
+            self._reload_lock.release()
+        return True
+
+    def lookup(self, prefix, limit=10):
+        """Returns up to limit airports whose city, country, airport name or code starts with prefix, in city order, or None if the index is unavailable"""
+        if not self._ensure_loaded():
+            return None
+        prefix = self._normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            i = bisect.bisect_left(self._keys, (prefix, -1))
+            positions = set()
+            while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+                positions.add(self._keys[i][1])
+                i += 1
+            return [self._entries[pos] for pos in sorted(positions)[:limit]]
+
+destination_index = DestinationIndex()
+# A forked worker starts with an empty index and fresh locks and loads its own on first lookup
+after_fork(destination_index.__init__)
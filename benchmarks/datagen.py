@@ -0,0 +1,302 @@
+"""Deterministic synthetic data generator for the flytau schema.
+
+Fills every table (airports, routes, planes, classes, seats, pilots, flight attendants, crew assignments,
+flights, pricing, customers, bookings and tickets) from a seed. Dates are laid out around an anchor day
+(--now, today by default), so the same seed, arguments and anchor always produce the same data in an empty
+schema. Each plane flies round trips out of the hub with its own crew team, so plane and crew
+locations stay continuous, long-haul legs only get large planes and qualified crew, and seats are never sold
+twice on a flight. Rows are streamed in batched multi-row inserts with foreign key and unique checks off for
+the session, which keeps memory flat and loads millions of tickets in minutes.
+
+    FLYTAU_DB_NAME=flytau_bench python -m benchmarks.datagen --planes 200 --days-back 180 --days-ahead 90
+"""
+import argparse
+import random
+import string
+import time
+from datetime import datetime, timedelta
+from database import Database
+
+db = Database()
+
+HUB = ('TLV', 'Tel Aviv', 'Israel', 'Ben Gurion Airport')
+DESTINATIONS = [
+    ('AMS', 'Amsterdam', 'Netherlands', 'Schiphol Airport', 285),
+    ('ATH', 'Athens', 'Greece', 'Athens International Airport', 135),
+    ('BER', 'Berlin', 'Germany', 'Berlin Brandenburg Airport', 260),
+    ('CAI', 'Cairo', 'Egypt', 'Cairo International Airport', 90),
+    ('NRT', 'Tokyo', 'Japan', 'Narita International Airport', 690),
+]
+FIRST_NAMES = ['Noa', 'Ariel', 'Maya', 'Daniel', 'Yael', 'Omer', 'Tamar', 'Itay', 'Shira', 'Eitan', 'Lior', 'Roni']
+LAST_NAMES = ['Cohen', 'Levi', 'Mizrahi', 'Peretz', 'Biton', 'Friedman', 'Azulay', 'Katz', 'Dahan', 'Shapiro']
+
+BENCH_MANAGER_ID = '900000001'
+BENCH_MANAGER_PASSWORD = 'bench'
+LONG_HAUL_MINUTES = 360
+TURNAROUND = timedelta(minutes=90)
+LAYOUTS = {
+    'Large': [('Economy', 30, 6), ('Business', 6, 4)],
+    'Small': [('Economy', 25, 6)],
+}
+CREW = {
+    'Large': {'pilot': 3, 'attendant': 6},
+    'Small': {'pilot': 2, 'attendant': 3},
+}
+
+class BulkWriter:
+    """Per-table row buffers flushed as multi-row inserts once they reach batch_size, in parent-before-child order"""
+    ORDER = ['airports', 'routes', 'managers', 'planes', 'classes', 'seats', 'pilots', 'flight_attendants',
+             'customers', 'registered_customers', 'guest_customers', 'phone_numbers', 'flights', 'flight_pricing',
+             'pilots_in_flights', 'flight_attendants_in_flights', 'bookings', 'tickets']
+
+    def __init__(self, connection, batch_size):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.columns = {}
+        self.rows = {}
+        self.counts = {}
+
+    def add(self, table, columns, row):
+        self.columns.setdefault(table, columns)
+        buffer = self.rows.setdefault(table, [])
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        cursor = self.connection.cursor()
+        try:
+            for table in self.ORDER:
+                rows = self.rows.get(table)
+                if not rows:
+                    continue
+                columns = ", ".join(f"`{c}`" for c in self.columns[table])
+                placeholders = ", ".join(["%s"] * len(self.columns[table]))
+                cursor.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", rows)
+                self.counts[table] = self.counts.get(table, 0) + len(rows)
+                self.rows[table] = []
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+class DataGenerator:
+    """Generates a consistent airline: network, fleet with crew teams, customers, and a flight schedule with bookings"""
+    def __init__(self, seed=42, destinations=12, planes=40, reserve_crew=0.1, customers=5000, registered_share=0.5,
+                 days_back=90, days_ahead=60, load_factor=0.75, cancel_rate=0.02, client_cancel_rate=0.04,
+                 batch_size=5000, now=None):
+        self.rng = random.Random(seed)
+        self.destinations = destinations
+        self.planes = planes
+        self.reserve_crew = reserve_crew
+        self.customers = customers
+        self.registered_share = registered_share
+        self.days_back = days_back
+        self.days_ahead = days_ahead
+        self.load_factor = load_factor
+        self.cancel_rate = cancel_rate
+        self.client_cancel_rate = client_cancel_rate
+        self.batch_size = batch_size
+        self.now = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def _name(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def _next_id(self, cursor, table, column):
+        cursor.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+        return int(cursor.fetchone()[0]) + 1
+
+    # --- Network, fleet and people ---
+
+    def _network(self, writer):
+        airports = [HUB + (None,)] + DESTINATIONS[:self.destinations]
+        for i in range(max(self.destinations - len(DESTINATIONS), 0)):
+            code = 'Z' + string.ascii_uppercase[i // 26 % 26] + string.ascii_uppercase[i % 26]
+            airports.append((code, f"City {code}", 'Synthetica', f"{code} International", self.rng.randrange(60, 780, 5)))
+        for code, city, country, name, _ in airports:
+            writer.add('airports', ('airport_code', 'city', 'country', 'airport_name'), (code, city, country, name))
+
+        self.routes = {}
+        route_id = self.first_route_id
+        for code, _, _, _, minutes in airports[1:]:
+            for origin, dest in ((HUB[0], code), (code, HUB[0])):
+                writer.add('routes', ('id_route', 'origin_code', 'destination_code', 'duration'),
+                           (route_id, origin, dest, f"{minutes // 60:02d}:{minutes % 60:02d}:00"))
+                self.routes[(origin, dest)] = (route_id, minutes)
+                route_id += 1
+        self.destination_codes = [(a[0], a[4]) for a in airports[1:]]
+
+    def _fleet(self, writer):
+        self.fleet = []
+        worker_id = 100000000
+        for i in range(self.planes):
+            size = 'Large' if self.rng.random() < 0.4 else 'Small'
+            plane_id = f"P{i + 1:05d}"
+            writer.add('planes', ('id_plane', 'manufacturer', 'size', 'purchase_date'),
+                       (plane_id, self.rng.choice(['Boeing', 'Airbus', 'Dassault']) if size == 'Large' else
+                        self.rng.choice(['Airbus', 'Embraer']), size,
+                        f"{self.rng.randint(2005, 2023)}-{self.rng.randint(1, 12):02d}-01"))
+            for class_type, rows, cols in LAYOUTS[size]:
+                writer.add('classes', ('class_type', 'num_rows', 'num_cols', 'id_plane'), (class_type, rows, cols, plane_id))
+                for r in range(1, rows + 1):
+                    for letter in string.ascii_uppercase[:cols]:
+                        writer.add('seats', ('row_number', 'seat_letter', 'class_type', 'id_plane'), (r, letter, class_type, plane_id))
+
+            team = {}
+            for role, count in CREW[size].items():
+                team[role] = []
+                for _ in range(count):
+                    worker_id += 1
+                    self._worker(writer, role, worker_id, size == 'Large')
+                    team[role].append(str(worker_id))
+            self.fleet.append((plane_id, size, team))
+
+        for _ in range(int(self.planes * self.reserve_crew)):
+            for role in ('pilot', 'attendant'):
+                worker_id += 1
+                self._worker(writer, role, worker_id, self.rng.random() < 0.5)
+
+    def _worker(self, writer, role, worker_id, long_flights):
+        first, last = self._name()
+        writer.add('pilots' if role == 'pilot' else 'flight_attendants',
+                   ('id_worker', 'first_name', 'last_name', 'phone_number', 'start_date', 'city', 'street',
+                    'house_number', 'long_flights'),
+                   (str(worker_id), first, last, f"05{self.rng.randrange(10 ** 8):08d}",
+                    f"{self.rng.randint(2000, 2023)}-{self.rng.randint(1, 12):02d}-01", HUB[1], 'Herzl',
+                    self.rng.randint(1, 200), 1 if long_flights else 0))
+
+    def _people(self, writer):
+        writer.add('managers', ('id_worker', 'first_name', 'last_name', 'phone_number', 'start_date', 'city', 'street',
+                                'house_number', 'password'),
+                   (BENCH_MANAGER_ID, 'Bench', 'Manager', '0500000000', '2020-01-01', HUB[1], 'Herzl', 1,
+                    BENCH_MANAGER_PASSWORD))
+        self.customer_pool = []
+        for n in range(self.customers):
+            email = f"customer{n}@example.com"
+            first, last = self._name()
+            registered = self.rng.random() < self.registered_share
+            writer.add('customers', ('email', 'first_name_eng', 'last_name_eng'), (email, first, last))
+            writer.add('phone_numbers', ('phone_number', 'customers_email'), (f"05{self.rng.randrange(10 ** 8):08d}", email))
+            if registered:
+                writer.add('registered_customers',
+                           ('customers_email', 'password', 'birth_date', 'passport', 'registration_date'),
+                           (email, 'password', f"{self.rng.randint(1950, 2005)}-{self.rng.randint(1, 12):02d}-15",
+                            f"P{n:08d}", '2022-01-01'))
+            else:
+                writer.add('guest_customers', ('customers_email',), (email,))
+            self.customer_pool.append((email, first, last, registered))
+
+    # --- Schedule and bookings ---
+
+    def _schedule(self, writer):
+        """Every plane shuttles hub -> destination -> hub with its own crew from days_back ago until days_ahead from now"""
+        start = (self.now - timedelta(days=self.days_back)).replace(hour=5, minute=0)
+        end = self.now + timedelta(days=self.days_ahead)
+        for plane_id, size, team in self.fleet:
+            reachable = [(code, minutes) for code, minutes in self.destination_codes
+                         if size == 'Large' or minutes <= LONG_HAUL_MINUTES]
+            departure = start + timedelta(minutes=self.rng.randrange(0, 24 * 60, 15))
+            while departure < end:
+                code, _ = self.rng.choice(reachable)
+                cancelled = self.rng.random() < self.cancel_rate
+                for leg in ((HUB[0], code), (code, HUB[0])):
+                    route_id, minutes = self.routes[leg]
+                    self._flight(writer, plane_id, size, team, route_id, minutes, departure, cancelled)
+                    departure += timedelta(minutes=minutes) + TURNAROUND
+                departure += timedelta(minutes=self.rng.randrange(0, 12 * 60, 15))
+
+    def _flight(self, writer, plane_id, size, team, route_id, minutes, departure, cancelled):
+        flight_id = self.next_flight_id
+        self.next_flight_id += 1
+        writer.add('flights', ('id_flight', 'id_route', 'id_plane', 'departure_time', 'flight_status', 'managers_id_worker'),
+                   (flight_id, route_id, plane_id, departure, 'Cancelled' if cancelled else 'Scheduled', BENCH_MANAGER_ID))
+        for worker in team['pilot']:
+            writer.add('pilots_in_flights', ('id_worker', 'id_flight'), (worker, flight_id))
+        for worker in team['attendant']:
+            writer.add('flight_attendants_in_flights', ('id_worker', 'id_flight'), (worker, flight_id))
+
+        economy = round(60 + minutes * self.rng.uniform(0.7, 1.1))
+        prices = {'Economy': economy, 'Business': economy * 3}
+        for class_type, _, _ in LAYOUTS[size]:
+            writer.add('flight_pricing', ('id_flight', 'price', 'class_type'), (flight_id, prices[class_type], class_type))
+
+        for class_type, rows, cols in LAYOUTS[size]:
+            seats = [(r, letter) for r in range(1, rows + 1) for letter in string.ascii_uppercase[:cols]]
+            sold = min(len(seats), int(len(seats) * self.load_factor * self.rng.uniform(0.6, 1.25)))
+            taken = self.rng.sample(seats, sold)
+            i = 0
+            while i < len(taken):
+                party = taken[i:i + self.rng.choice((1, 1, 2, 2, 3, 4))]
+                i += len(party)
+                self._booking(writer, flight_id, plane_id, departure, cancelled, class_type, prices[class_type], party)
+
+    def _booking(self, writer, flight_id, plane_id, departure, flight_cancelled, class_type, price, party):
+        booking_id = self.next_booking_id
+        self.next_booking_id += 1
+        email, first, last, registered = self.rng.choice(self.customer_pool)
+        total = price * len(party)
+        if flight_cancelled:
+            status = 'Cancelled_System'
+        elif self.rng.random() < self.client_cancel_rate:
+            status, total = 'Cancelled_Client', round(total * 0.05, 2)
+        else:
+            status = 'Completed' if departure <= self.now else 'Confirmed'
+        booked_at = min(departure - timedelta(days=self.rng.randint(1, 60)), self.now)
+        writer.add('bookings', ('id_booking', 'customers_email', 'registered_email', 'booking_date', 'status', 'total_price'),
+                   (booking_id, email, email if registered else None, booked_at, status, total))
+        for n, (row, letter) in enumerate(party):
+            name = f"{first} {last}" if n == 0 else " ".join(self._name())
+            writer.add('tickets', ('id_booking', 'id_flight', 'passenger_name', 'passenger_passport', 'class_type',
+                                   'row_number', 'seat_letter', 'id_plane'),
+                       (booking_id, flight_id, name, f"{booking_id:09d}{n}", class_type, row, letter, plane_id))
+
+    def run(self):
+        """Generates everything in one pass and rebuilds the position ledger; returns the row count per table"""
+        connection = db.connection
+        cursor = connection.cursor()
+        try:
+            self.first_route_id = self._next_id(cursor, 'routes', 'id_route')
+            self.next_flight_id = self._next_id(cursor, 'flights', 'id_flight')
+            self.next_booking_id = max(self._next_id(cursor, 'bookings', 'id_booking'), 1001)
+            cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+        finally:
+            cursor.close()
+
+        writer = BulkWriter(connection, self.batch_size)
+        try:
+            self._network(writer)
+            self._fleet(writer)
+            self._people(writer)
+            self._schedule(writer)
+            writer.flush()
+        finally:
+            cursor = connection.cursor()
+            cursor.execute("SET SESSION foreign_key_checks = 1, unique_checks = 1")
+            cursor.close()
+        db.rebuild_position_ledger()
+        db.release_connection()
+        return writer.counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the flytau schema with deterministic synthetic data")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--destinations', type=int, default=12)
+    parser.add_argument('--planes', type=int, default=40)
+    parser.add_argument('--customers', type=int, default=5000)
+    parser.add_argument('--days-back', type=int, default=90)
+    parser.add_argument('--days-ahead', type=int, default=60)
+    parser.add_argument('--load-factor', type=float, default=0.75)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--now', type=lambda value: datetime.strptime(value, '%Y-%m-%d'), default=None,
+                        help="anchor date (YYYY-MM-DD) the schedule is laid out around; defaults to today")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = DataGenerator(seed=args.seed, destinations=args.destinations, planes=args.planes, customers=args.customers,
+                           days_back=args.days_back, days_ahead=args.days_ahead, load_factor=args.load_factor,
+                           batch_size=args.batch_size, now=args.now).run()
+    for table in BulkWriter.ORDER:
+        print(f"{table:<32}{counts.get(table, 0):>12,}")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
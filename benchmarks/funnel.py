@@ -0,0 +1,292 @@
+"""Booking funnel benchmark.
+
+Drives the real Flask routes (search, seat selection, passenger details, payment, manager dashboard and
+availability check) with concurrent simulated users through the Flask test client, against a local MySQL
+database. Reports p50/p95/p99 latency, throughput and database queries per request, and saves the results
+as JSON so runs can be compared across commits.
+
+    FLYTAU_DB_NAME=flytau_bench python -m benchmarks.funnel --seed --users 8 --iterations 20
+    python -m benchmarks.funnel --compare benchmarks/results/<before>.json benchmarks/results/<after>.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from database import Database, DB_CONFIG
+from benchmarks.datagen import DataGenerator, BENCH_MANAGER_ID
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+PERCENTILES = (50, 95, 99)
+
+_counter = threading.local()   # .current: the QueryCount of the request the calling thread is working for
+
+class QueryCount:
+    """Queries issued on behalf of one request, from its own thread and from the fan-out workers serving it"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+
+    def add(self):
+        with self._lock:
+            self.queries += 1
+
+def _count_query():
+    count = getattr(_counter, 'current', None)
+    if count is not None:
+        count.add()
+
+class CountingCursor:
+    """Cursor proxy counting every statement executed against the current request's QueryCount"""
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        _count_query()
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        _count_query()
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class CountingConnection:
+    """Pooled-connection proxy whose cursors count queries"""
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+def install_query_counter():
+    """Counts queries on primary and replica connections, and carries the submitting request's count into fan-out workers"""
+    import models
+    acquire = Database._acquire
+    Database._acquire = lambda self: CountingConnection(acquire(self))
+    replica_connection = Database._replica_connection
+
+    def counted_replica_connection(self):
+        conn = replica_connection(self)
+        return CountingConnection(conn) if conn is not None else None
+    Database._replica_connection = counted_replica_connection
+
+    fan_out = models.fan_out
+
+    def counted_fan_out(fn, *args):
+        count = getattr(_counter, 'current', None)
+
+        def task(*task_args):
+            _counter.current = count
+            try:
+                return fn(*task_args)
+            finally:
+                _counter.current = None
+        return fan_out(task, *args)
+    models.fan_out = counted_fan_out
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100.0 * len(ordered)) - 1, 0)]
+
+class Recorder:
+    """Collects latency, status and query count per funnel step across user threads"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def call(self, step, fn, *args, **kwargs):
+        count = _counter.current = QueryCount()
+        started = time.perf_counter()
+        try:
+            response = fn(*args, **kwargs)
+        finally:
+            _counter.current = None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.samples.setdefault(step, []).append((elapsed_ms, response.status_code, count.queries))
+        return response
+
+    def summary(self, wall_seconds):
+        steps = {}
+        total = 0
+        for step, samples in self.samples.items():
+            latencies = [s[0] for s in samples]
+            total += len(samples)
+            steps[step] = {
+                'requests': len(samples),
+                'errors': sum(1 for s in samples if s[1] >= 500),
+                'mean_ms': round(sum(latencies) / len(latencies), 2),
+                **{f'p{p}_ms': round(percentile(latencies, p), 2) for p in PERCENTILES},
+                'queries_per_request': round(sum(s[2] for s in samples) / len(samples), 2),
+            }
+        return {'requests': total, 'wall_seconds': round(wall_seconds, 2),
+                'throughput_rps': round(total / wall_seconds, 2) if wall_seconds else None, 'steps': steps}
+
+def _load_targets():
+    """Upcoming flights with their search parameters and cabin layout, and the routes a manager can schedule on"""
+    db = Database()
+    cursor = db.connection.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT f.id_flight, DATE(f.departure_time) AS flight_date, a1.city AS origin, a2.city AS destination,
+                   c.class_type, c.num_rows, c.num_cols
+            FROM flights f
+            JOIN routes r ON f.id_route = r.id_route
+            JOIN airports a1 ON r.origin_code = a1.airport_code
+            JOIN airports a2 ON r.destination_code = a2.airport_code
+            JOIN classes c ON c.id_plane = f.id_plane
+            WHERE f.flight_status = 'Scheduled' AND f.departure_time > NOW() + INTERVAL 2 DAY
+        """)
+        flights = {}
+        for row in cursor.fetchall():
+            flight = flights.setdefault(row['id_flight'], {'id_flight': row['id_flight'], 'date': str(row['flight_date']),
+                                                           'origin': row['origin'], 'destination': row['destination'],
+                                                           'cabins': []})
+            flight['cabins'].append((row['class_type'], row['num_rows'], row['num_cols']))
+        cursor.execute("SELECT id_route FROM routes")
+        routes = [row['id_route'] for row in cursor.fetchall()]
+        return list(flights.values()), routes
+    finally:
+        cursor.close()
+        db.release_connection()
+
+def customer_session(app, recorder, flight, rng, user_no):
+    """One guest customer going from search to payment"""
+    client = app.test_client()
+    recorder.call('search', client.get, '/', query_string={'origin': flight['origin'], 'destination': flight['destination'],
+                                                           'date': flight['date'], 'trip_type': 'oneway'})
+    recorder.call('select_seats', client.get, '/select-seats', query_string={'flight_id': flight['id_flight']})
+
+    class_type, rows, cols = rng.choice(flight['cabins'])
+    seat = f"{class_type}-{rng.randint(1, rows)}-{'ABCDEFGHIJKLMNOPQRSTUVWXYZ'[rng.randrange(cols)]}"
+    response = recorder.call('process_booking', client.post, '/process-booking',
+                             data={'flight_id': flight['id_flight'], 'seats': [seat]})
+    if 'passenger-details' not in response.headers.get('Location', ''):
+        return
+    recorder.call('passenger_details', client.get, '/passenger-details')
+    email = f"funnel{user_no}_{rng.randrange(10 ** 9)}@example.com"
+    recorder.call('save_passengers', client.post, '/save-passengers',
+                  data={'first_name_1': 'Funnel', 'last_name_1': f"User{user_no}",
+                        'passport_1': f"F{rng.randrange(10 ** 8):08d}", 'email_1': email, 'phone_numbers': '0500000000'})
+    recorder.call('booking_summary', client.get, '/booking-summery')
+    recorder.call('booking_payment', client.post, '/booking-payment')
+
+def manager_session(app, recorder, routes, rng):
+    """One manager viewing the dashboard and checking resources for a new flight"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['role'] = 'manager'
+        session['user_id'] = BENCH_MANAGER_ID
+    recorder.call('manager_dashboard', client.get, '/manager/dashboard')
+    dept_time = datetime.now() + timedelta(days=rng.randint(3, 14), hours=rng.randint(0, 23))
+    recorder.call('check_availability', client.post, '/api/check_availability',
+                  json={'route_id': rng.choice(routes), 'dept_time': f"{dept_time:%Y-%m-%dT%H}:00"})
+
+def run(users=8, iterations=10, manager_share=0.1, seed_value=1):
+    install_query_counter()
+    from main import app
+    flights, routes = _load_targets()
+    if not flights:
+        raise SystemExit("No upcoming flights found; run with --seed first.")
+    recorder = Recorder()
+
+    def user_loop(user_no):
+        rng = random.Random(seed_value * 1000 + user_no)
+        for _ in range(iterations):
+            if rng.random() < manager_share:
+                manager_session(app, recorder, routes, rng)
+            else:
+                customer_session(app, recorder, rng.choice(flights), rng, user_no)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user_loop, range(users)))
+    return recorder.summary(time.perf_counter() - started)
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       cwd=os.path.dirname(RESULTS_DIR)).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def save(result, config):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    commit = _git_commit()
+    payload = {'commit': commit, 'timestamp': datetime.now().isoformat(timespec='seconds'),
+               'database': DB_CONFIG['database'], 'config': config, **result}
+    path = os.path.join(RESULTS_DIR, f"funnel-{commit}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+def print_summary(result):
+    print(f"{'step':<20}{'reqs':>7}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}")
+    for step, s in result['steps'].items():
+        print(f"{step:<20}{s['requests']:>7}{s['errors']:>5}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}"
+              f"{s['queries_per_request']:>9.1f}")
+    print(f"{result['requests']} requests in {result['wall_seconds']}s ({result['throughput_rps']} req/s)")
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before['commit']} -> {after['commit']}")
+    print(f"{'step':<20}{'p50':>18}{'p95':>18}{'queries':>16}")
+    for step in sorted(set(before['steps']) | set(after['steps'])):
+        b, a = before['steps'].get(step), after['steps'].get(step)
+        if not b or not a:
+            print(f"{step:<20}{'(only in one run)':>18}")
+            continue
+        cells = []
+        for key in ('p50_ms', 'p95_ms'):
+            change = (a[key] - b[key]) / b[key] * 100 if b[key] else 0.0
+            cells.append(f"{b[key]:.1f}->{a[key]:.1f} {change:+.0f}%")
+        cells.append(f"{b['queries_per_request']:.1f}->{a['queries_per_request']:.1f}")
+        print(f"{step:<20}{cells[0]:>18}{cells[1]:>18}{cells[2]:>16}")
+    print(f"throughput: {before['throughput_rps']} -> {after['throughput_rps']} req/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Booking funnel benchmark")
+    parser.add_argument('--users', type=int, default=8, help="concurrent simulated users")
+    parser.add_argument('--iterations', type=int, default=10, help="funnel runs per user")
+    parser.add_argument('--manager-share', type=float, default=0.1, help="share of runs that are manager sessions")
+    parser.add_argument('--seed', action='store_true', help="fill an empty database with generated data before running")
+    parser.add_argument('--planes', type=int, default=40)
+    parser.add_argument('--days-back', type=int, default=30)
+    parser.add_argument('--days-ahead', type=int, default=30)
+    parser.add_argument('--load-factor', type=float, default=0.75)
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="compare two saved result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.seed:
+        counts = DataGenerator(planes=args.planes, days_back=args.days_back, days_ahead=args.days_ahead,
+                               load_factor=args.load_factor).run()
+        print(f"Seeded {counts.get('flights', 0)} flights, {counts.get('tickets', 0)} tickets")
+    config = {'users': args.users, 'iterations': args.iterations, 'manager_share': args.manager_share}
+    result = run(args.users, args.iterations, args.manager_share)
+    print_summary(result)
+    print(f"Saved {save(result, config)}")
+
+if __name__ == '__main__':
+    main()
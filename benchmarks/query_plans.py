@@ -0,0 +1,292 @@
+"""EXPLAIN-based query plan checks for the Database class.
+
+A manual tool, not part of any automated test run: run it against a seeded database before merging changes
+that touch SQL or indexes. It calls the Database methods with real parameters sampled from the data (see
+benchmarks/datagen.py), with every read forced onto the primary so statements normally sent to a replica are
+captured too, and runs EXPLAIN on each statement issued. Write paths run inside a transaction that is rolled
+back. For every table access the plan's access type, key and estimated rows are recorded. The run exits with
+code 1 when a hot query does a full scan of a large table, exceeds its row-estimate budget, or regresses
+against a recorded baseline. Database read methods the workload does not call are listed, so new queries get
+added to it.
+
+    FLYTAU_DB_NAME=flytau_bench python -m benchmarks.query_plans --record     # store the baseline
+    FLYTAU_DB_NAME=flytau_bench python -m benchmarks.query_plans              # check against budgets and baseline
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from database import Database
+
+db = Database()
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_plans_baseline.json')
+
+# Best to worst, as reported in EXPLAIN's "type" column
+ACCESS_TYPES = ['system', 'const', 'eq_ref', 'ref', 'fulltext', 'ref_or_null', 'index_merge', 'unique_subquery',
+                'index_subquery', 'range', 'index', 'ALL']
+LARGE_TABLES = {'flights', 'tickets', 'bookings', 'flight_pricing', 'pilots_in_flights',
+                'flight_attendants_in_flights', 'seats', 'customers', 'resource_positions'}
+# Hot query -> maximum estimated rows for any single table access
+HOT_QUERIES = {
+    'get_flight_data': 5000,
+    'get_occupied_seats': 1000,
+    'get_flight_prices': 10,
+    'get_single_booking': 100,
+    'get_booking_details_for_cancellation': 100,
+    'get_booking_tickets': 100,
+    'get_customer_bookings_page': 5000,
+    'get_available_resources': 5000,
+}
+ROW_GROWTH_TOLERANCE = 2.0
+EXPLAINABLE = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT\s+.*\bSELECT\b)', re.IGNORECASE | re.DOTALL)
+
+class StatementCapture:
+    """Wraps pooled connections so every executed statement is recorded under the workload label that issued it; commits are suppressed so writes can be rolled back"""
+    def __init__(self):
+        self.label = None
+        self.statements = {}
+        self.connections = []
+
+    @contextmanager
+    def labelled(self, label):
+        self.label = label
+        try:
+            yield
+        finally:
+            self.label = None
+
+    def record(self, query, params):
+        if self.label and EXPLAINABLE.match(query):
+            key = (self.label, " ".join(query.split()))
+            self.statements.setdefault(key, (query, params))
+
+    def install(self):
+        capture = self
+        acquire = Database._acquire
+
+        class Cursor:
+            def __init__(self, cursor):
+                self._cursor = cursor
+
+            def execute(self, query, params=()):
+                capture.record(query, params)
+                return self._cursor.execute(query, params)
+
+            def executemany(self, query, seq):
+                seq = list(seq)
+                if seq:
+                    capture.record(query, seq[0])
+                return self._cursor.executemany(query, seq)
+
+            def __iter__(self):
+                return iter(self._cursor)
+
+            def __getattr__(self, name):
+                return getattr(self._cursor, name)
+
+        class Connection:
+            def __init__(self, connection):
+                self._connection = connection
+                capture.connections.append(connection)
+
+            def cursor(self, *args, **kwargs):
+                return Cursor(self._connection.cursor(*args, **kwargs))
+
+            def commit(self):
+                pass
+
+            def __getattr__(self, name):
+                return getattr(self._connection, name)
+
+        Database._acquire = lambda self: Connection(acquire(self))
+        return acquire
+
+    def rollback_all(self):
+        for connection in self.connections:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+
+def _sample(query, params=()):
+    cursor = db.connection.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchone() or {}
+    finally:
+        cursor.close()
+
+def workload():
+    """(label, call) pairs covering the Database methods with parameters taken from the seeded data"""
+    flight = _sample("""
+        SELECT f.id_flight, f.id_route, f.id_plane, f.departure_time, a1.city AS origin, a2.city AS destination
+        FROM flights f JOIN routes r ON f.id_route = r.id_route
+        JOIN airports a1 ON r.origin_code = a1.airport_code JOIN airports a2 ON r.destination_code = a2.airport_code
+        WHERE f.flight_status = 'Scheduled' AND f.departure_time > NOW() + INTERVAL 3 DAY
+        ORDER BY f.departure_time LIMIT 1
+    """)
+    booking = _sample("SELECT id_booking, customers_email, registered_email FROM bookings "
+                      "WHERE registered_email IS NOT NULL ORDER BY id_booking DESC LIMIT 1")
+    worker = _sample("SELECT id_worker FROM pilots LIMIT 1")
+    if not flight or not booking:
+        raise SystemExit("The database has no upcoming flights or registered bookings; seed it with benchmarks.datagen first.")
+
+    fid, day = flight['id_flight'], flight['departure_time'].strftime('%Y-%m-%d')
+    back = (flight['departure_time'] + timedelta(days=3)).strftime('%Y-%m-%d')
+    origin, dest = flight['origin'], flight['destination']
+    email, bid = booking['registered_email'], booking['id_booking']
+    dep = flight['departure_time']
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    return [
+        ('get_all_destinations', lambda: db.get_all_destinations()),
+        ('get_flight_data', lambda: db.get_flight_data(date_str=day, origin=origin, destination=dest)),
+        ('get_flight_data_by_id', lambda: db.get_flight_data(flight_id=fid)),
+        ('get_nearest_flight_date', lambda: db.get_nearest_flight_date(origin, dest, day)),
+        ('get_fare_calendar', lambda: db.get_fare_calendar(origin, dest, day, back)),
+        ('get_round_trip_pairs', lambda: db.get_round_trip_pairs(origin, dest, day, back)),
+        ('get_fare_matrix_rows', lambda: db.get_fare_matrix_rows([fid])),
+        ('get_timetable_rows', lambda: db.get_timetable_rows([fid])),
+        ('get_plane_details_for_seatmap', lambda: db.get_plane_details_for_seatmap(fid)),
+        ('get_class_dimensions', lambda: db.get_class_dimensions(flight['id_plane'])),
+        ('get_flight_prices', lambda: db.get_flight_prices(fid)),
+        ('get_occupied_seats', lambda: db.get_occupied_seats(fid)),
+        ('email_exists', lambda: db.email_exists(email)),
+        ('get_single_booking', lambda: db.get_single_booking(email, bid)),
+        ('get_customer_booking_counts', lambda: db.get_customer_booking_counts(email)),
+        ('get_customer_bookings_page', lambda: db.get_customer_bookings_page(email, 'Completed')),
+        ('get_booking_tickets', lambda: db.get_booking_tickets(email, bid)),
+        ('get_booking_details_for_cancellation', lambda: db.get_booking_details_for_cancellation(bid)),
+        ('get_full_user_details', lambda: db.get_full_user_details(email)),
+        ('get_all_flights_for_manager', lambda: db.get_all_flights_for_manager()),
+        ('get_flight_crew_names', lambda: db.get_flight_crew_names(fid)),
+        ('get_routes_only', lambda: db.get_routes_only()),
+        ('get_available_resources', lambda: db.get_available_resources(dep.strftime('%Y-%m-%d %H:%M'), flight['id_route'])),
+        ('get_resource_position', lambda: db.get_resource_position('pilot', worker.get('id_worker'), dep)),
+        ('get_resources_page', lambda: db.get_resources_page('pilot', 0, 25, True)),
+        ('iter_flight_manifest', lambda: list(db.iter_flight_manifest(fid))),
+        ('iter_bookings_by_date', lambda: list(db.iter_bookings_by_date(today, today))),
+        ('iter_revenue_by_route', lambda: list(db.iter_revenue_by_route(today, today))),
+        ('get_report_flights', lambda: db.get_report_flights(since_id=fid)),
+        ('get_report_bookings', lambda: db.get_report_bookings(since_id=bid)),
+        ('get_report_tickets', lambda: db.get_report_tickets(bid - 1000, bid)),
+        ('get_report_crew', lambda: db.get_report_crew(fid - 100, fid)),
+        ('get_report_flight_states', lambda: db.get_report_flight_states(dep - timedelta(days=1))),
+        ('get_report_booking_states', lambda: db.get_report_booking_states(dep - timedelta(days=1))),
+        ('get_job', lambda: db.get_job(1)),
+        ('update_booking_status', lambda: db.update_booking_status(bid, 'Confirmed', 0)),
+        ('complete_departed_bookings', lambda: db.complete_departed_bookings()),
+        ('cancel_flight_full_logic', lambda: db.cancel_flight_full_logic(fid)),
+        ('cancel_flights_bulk', lambda: db.cancel_flights_bulk(route_id=flight['id_route'], date_from=day, date_to=day)),
+        ('archive_departed_flights', lambda: db.archive_departed_flights(older_than_days=100000)),
+    ]
+
+def explain(query, params):
+    cursor = db.connection.cursor(dictionary=True)
+    try:
+        cursor.execute("EXPLAIN " + query, params)
+        return [{'table': row.get('table'), 'type': row.get('type'), 'key': row.get('key'),
+                 'rows': int(row.get('rows') or 0)} for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+def collect():
+    capture = StatementCapture()
+    original_acquire = capture.install()
+    try:
+        with db.primary_only():
+            for label, call in workload():
+                with capture.labelled(label):
+                    try:
+                        call()
+                    except Exception as e:
+                        print(f"{label}: call failed ({e})")
+    finally:
+        capture.rollback_all()
+        db.release_connection()
+        Database._acquire = original_acquire
+
+    plans = {}
+    for (label, normalized), (query, params) in capture.statements.items():
+        try:
+            accesses = explain(query, params)
+        except Exception as e:
+            print(f"{label}: EXPLAIN failed ({e})")
+            continue
+        plans.setdefault(label, []).append({'sql': normalized[:300], 'accesses': accesses})
+    db.release_connection()
+    return plans
+
+def uncovered(plans):
+    """Database query methods (get_*/iter_*) that no workload label starts with"""
+    methods = sorted(name for name in dir(Database) if name.startswith(('get_', 'iter_')) and name != 'iter_query'
+                     and callable(getattr(Database, name)))
+    return [name for name in methods if not any(label == name or label.startswith(name + '_') for label in plans)]
+
+def _rank(access_type):
+    return ACCESS_TYPES.index(access_type) if access_type in ACCESS_TYPES else 0
+
+def check(plans, baseline):
+    failures = []
+    for label, statements in sorted(plans.items()):
+        for n, statement in enumerate(statements):
+            for access in statement['accesses']:
+                table = access['table'] or ''
+                if label in HOT_QUERIES and table in LARGE_TABLES and access['type'] == 'ALL':
+                    failures.append(f"{label}[{n}]: full scan of {table} ({access['rows']} rows)")
+                if label in HOT_QUERIES and access['rows'] > HOT_QUERIES[label] and not table.startswith('<'):
+                    failures.append(f"{label}[{n}]: {table} estimates {access['rows']} rows, budget {HOT_QUERIES[label]}")
+
+            previous = baseline.get(label, [])
+            if n >= len(previous) or previous[n]['sql'] != statement['sql']:
+                continue
+            before = {a['table']: a for a in previous[n]['accesses']}
+            for access in statement['accesses']:
+                old = before.get(access['table'])
+                if not old:
+                    continue
+                if _rank(access['type']) > _rank(old['type']):
+                    failures.append(f"{label}[{n}]: {access['table']} access {old['type']} -> {access['type']}")
+                if old['rows'] and access['rows'] > old['rows'] * ROW_GROWTH_TOLERANCE:
+                    failures.append(f"{label}[{n}]: {access['table']} rows {old['rows']} -> {access['rows']}")
+    return failures
+
+def print_plans(plans):
+    for label, statements in sorted(plans.items()):
+        for n, statement in enumerate(statements):
+            accesses = ", ".join(f"{a['table']}:{a['type']}/{a['key'] or '-'}/{a['rows']}" for a in statement['accesses'])
+            marker = '*' if label in HOT_QUERIES else ' '
+            print(f"{marker} {label}[{n}]  {accesses}")
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN plan checks for the Database class")
+    parser.add_argument('--record', action='store_true', help="save the current plans as the baseline")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    plans = collect()
+    print_plans(plans)
+    missing = uncovered(plans)
+    if missing:
+        print(f"Not covered by the workload: {', '.join(missing)}")
+    if args.record:
+        with open(args.baseline, 'w') as f:
+            json.dump(plans, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    failures = check(plans, baseline)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{sum(len(s) for s in plans.values())} statements checked, {len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Micro-benchmarks for the view-preparation helpers in utils.
+
+Measures prepare_flights_for_view, _format_datetime, _format_price, map_occupied_seats and
+validate_seat_selection over realistic row volumes with timeit, and their allocations with tracemalloc. The
+batched prepare_flights_for_view is compared with the original row-by-row implementation, kept here as a
+reference, to show the speed-up. No database is needed: rows are generated in memory, and the occupied-seat
+lookup of validate_seat_selection is served from a generated list. It also compares the memory held by a result
+set as dictionary-cursor rows and as the slotted FlightRow objects the database layer now returns.
+
+    python -m benchmarks.view_helpers --rows 2000
+"""
+import argparse
+import random
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+import utils
+from rows import FlightRow
+from utils import prepare_flights_for_view, _format_datetime, _format_price, map_occupied_seats, validate_seat_selection
+
+CITIES = ['Tel Aviv', 'Amsterdam', 'Athens', 'Berlin', 'Cairo', 'Tokyo']
+
+#The row-by-row implementation prepare_flights_for_view replaced: copies each row and formats every field with strftime
+def reference_prepare_flights_for_view(flights):
+    prepared = []
+    for f in flights or []:
+        f = dict(f)
+        f["departure_display"] = reference_format_datetime(f.get("departure_time"))
+        f["arrival_display"] = reference_format_datetime(f.get("arrival_time"))
+        f["price_display"] = _format_price(f.get("min_price"))
+        prepared.append(f)
+    return prepared
+
+def reference_format_datetime(value):
+    if value is None:
+        return ""
+    dt = value if isinstance(value, datetime) else datetime.strptime(str(value), "%Y-%m-%d %H:%M:%S")
+    return dt.strftime("%d %b %Y, %H:%M")
+
+def make_flights(count, rng):
+    """Search-result rows as the dictionary cursor returns them: departures on a 15-minute grid, prices from a fare ladder"""
+    start = datetime(2026, 11, 1, 5, 0)
+    rows = []
+    for i in range(count):
+        departure = start + timedelta(minutes=15 * rng.randrange(0, 96 * 30))
+        origin, destination = rng.sample(CITIES, 2)
+        rows.append({
+            'id_flight': i + 1,
+            'departure_time': departure,
+            'arrival_time': departure + timedelta(minutes=rng.choice([90, 135, 260, 285, 690])),
+            'flight_status': 'Scheduled',
+            'origin': origin,
+            'destination': destination,
+            'min_price': Decimal(rng.choice([149, 199, 249.5, 299, 349, 420, 899])),
+        })
+    return rows
+
+def make_flight_rows(flights):
+    return [FlightRow(*(f[name] for name in FlightRow.fields)) for f in flights]
+
+def retained_kib(build):
+    """Memory still allocated after build() returns, in KiB, while its result is kept alive"""
+    tracemalloc.start()
+    kept = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current / 1024
+
+def make_occupied(rows, cols, share, rng):
+    seats = [(c, r, l) for c, n_rows, n_cols in (('Economy', rows, cols), ('Business', 6, 4))
+             for r in range(1, n_rows + 1) for l in 'ABCDEFGHIJ'[:n_cols]]
+    return [{'class_type': c, 'row_number': r, 'seat_letter': l} for c, r, l in rng.sample(seats, int(len(seats) * share))]
+
+def measure(fn, repeat=5, number=None):
+    """Best time per call in microseconds, and peak traced allocation in KiB for one call"""
+    timer = timeit.Timer(fn)
+    if number is None:
+        number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1e6, peak / 1024
+
+def run(rows=2000, seed=7):
+    rng = random.Random(seed)
+    flights = make_flights(rows, rng)
+    occupied = make_occupied(30, 6, 0.7, rng)
+    selection = [f"Economy-{rng.randint(1, 30)}-{rng.choice('ABCDEF')}" for _ in range(4)]
+    sample_dt = flights[0]['departure_time']
+
+    assert prepare_flights_for_view(flights) == reference_prepare_flights_for_view(flights)
+    assert prepare_flights_for_view(make_flight_rows(flights)) == reference_prepare_flights_for_view(flights)
+
+    original_lookup = utils.db.get_occupied_seats
+    utils.db.get_occupied_seats = lambda flight_id: occupied
+    try:
+        cases = [
+            (f'prepare_flights_for_view x{rows} (reference)', lambda: reference_prepare_flights_for_view(flights)),
+            (f'prepare_flights_for_view x{rows} (batched)', lambda: prepare_flights_for_view(flights)),
+            (f'prepare_flights_for_view x{rows} (slotted rows)',
+             lambda: prepare_flights_for_view(make_flight_rows(flights))),
+            ('_format_datetime (reference strftime)', lambda: reference_format_datetime(sample_dt)),
+            ('_format_datetime', lambda: _format_datetime(sample_dt)),
+            ('_format_datetime from string', lambda: _format_datetime('2026-11-01 05:00:00')),
+            ('_format_price', lambda: _format_price(Decimal('249.50'))),
+            (f'map_occupied_seats x{len(occupied)}', lambda: map_occupied_seats(occupied)),
+            ('validate_seat_selection (4 seats)', lambda: validate_seat_selection(selection, 1)),
+        ]
+        results = [(name, *measure(fn)) for name, fn in cases]
+    finally:
+        utils.db.get_occupied_seats = original_lookup
+    memory = {
+        'dict rows': retained_kib(lambda: reference_prepare_flights_for_view(flights)),
+        'slotted rows': retained_kib(lambda: prepare_flights_for_view(make_flight_rows(flights))),
+    }
+    return results, memory
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the utils view helpers")
+    parser.add_argument('--rows', type=int, default=2000, help="search-result rows per prepare_flights_for_view call")
+    args = parser.parse_args()
+
+    results, memory = run(args.rows)
+    print(f"{'case':<50}{'time/call':>14}{'peak alloc':>14}")
+    for name, micros, kib in results:
+        print(f"{name:<50}{micros:>11.1f} us{kib:>10.1f} KiB")
+    by_name = {name: micros for name, micros, _ in results}
+    reference = by_name[f'prepare_flights_for_view x{args.rows} (reference)']
+    batched = by_name[f'prepare_flights_for_view x{args.rows} (batched)']
+    print(f"prepare_flights_for_view speed-up: {reference / batched:.2f}x")
+    for name, kib in memory.items():
+        print(f"{args.rows} prepared {name}: {kib:.1f} KiB retained ({kib * 1024 / args.rows:.0f} bytes/row)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import threading
+import time
+
+class TTLCache:
+    """Small thread-safe cache whose entries expire after ttl seconds; clear() bumps a generation so results computed before an invalidation are never stored"""
+    def __init__(self, ttl=30, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if not entry:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if len(self._data) >= self.max_entries:
+                oldest = min(self._data, key=lambda k: self._data[k][0])
+                del self._data[oldest]
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key: the first caller runs the function, later callers wait for and share its result"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+def cached_call(cache, flight, key, fn):
+    """Serves key from cache, otherwise computes it once across concurrent callers and stores any non-empty result"""
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    def compute():
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+        generation = cache.generation
+        result = fn()
+        if result is not None:
+            cache.set(key, result, generation)
+        return result
+
+    return flight.do(key, compute)
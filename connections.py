@@ -0,0 +1,173 @@
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+import mysql.connector
+from database import Database, after_fork
+
+db = Database()
+
+MIN_CONNECTION_MINUTES = 60
+MAX_TOTAL_HOURS = 30
+MAX_STOPS = 2
+MAX_TIMETABLE_AGE_SECONDS = 300
+
+class Timetable:
+    """In-memory timetable of upcoming flights, indexed by departure airport and time, used to build connecting itineraries with a bounded time-dependent search; rebuilt once older than max_age seconds so departed flights drop out"""
+    def __init__(self, max_age=MAX_TIMETABLE_AGE_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._legs = {}          # flight_id -> leg dict
+        self._departures = {}    # origin_code -> sorted [(departure_time, flight_id)]
+        self._city_codes = {}    # city -> {airport_code}
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._changed_during_reload = None
+
+    def _is_fresh(self):
+        return self._loaded and time.monotonic() - self._loaded_at < self.max_age
+
+    def _ensure_loaded(self):
+        if self._is_fresh():
+            return
+        # One thread rebuilds; once a timetable exists the others keep searching it meanwhile
+        if not self._reload_lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            if self._is_fresh():
+                return
+            try:
+                self.reload()
+            except mysql.connector.Error as e:
+                if not self._loaded:
+                    raise
+                print(f"Timetable reload failed, keeping the current one: {e}")
+                self._loaded_at = time.monotonic()
+        finally:
+            self._reload_lock.release()
+
+    def reload(self):
+        """Builds a fresh timetable of upcoming flights aside and swaps it in, then re-reads flights changed while it was loading"""
+        with self._lock:
+            self._changed_during_reload = changed = set()
+        try:
+            fresh = Timetable()
+            for row in db.get_timetable_rows():
+                fresh._add_leg(row)
+        except BaseException:
+            with self._lock:
+                self._changed_during_reload = None
+            raise
+        with self._lock:
+            self._legs, self._departures, self._city_codes = fresh._legs, fresh._departures, fresh._city_codes
+            self._changed_during_reload = None
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+        if changed:
+            self.refresh_flights(changed)
+
+    def _add_leg(self, row):
+        leg = {
+            'id_flight': row['id_flight'],
+            'departure_time': row['departure_time'],
+            'arrival_time': row['arrival_time'],
+            'origin_code': row['origin_code'],
+            'origin': row['origin_city'],
+            'destination_code': row['destination_code'],
+            'destination': row['destination_city'],
+            'price': float(row['min_price'])
+        }
+        self._legs[leg['id_flight']] = leg
+        bisect.insort(self._departures.setdefault(leg['origin_code'], []), (leg['departure_time'], leg['id_flight']))
+        self._city_codes.setdefault(leg['origin'], set()).add(leg['origin_code'])
+        self._city_codes.setdefault(leg['destination'], set()).add(leg['destination_code'])
+
+    def _remove_leg(self, fid):
+        leg = self._legs.pop(fid, None)
+        if not leg:
+            return
+        deps = self._departures[leg['origin_code']]
+        i = bisect.bisect_left(deps, (leg['departure_time'], fid))
+        if i < len(deps) and deps[i] == (leg['departure_time'], fid):
+            deps.pop(i)
+
+    def refresh_flights(self, flight_ids):
+        """Re-reads only the given flights, so new and cancelled flights are reflected without rebuilding the timetable"""
+        flight_ids = [int(fid) for fid in flight_ids]
+        rows = db.get_timetable_rows(flight_ids)
+        with self._lock:
+            for fid in flight_ids:
+                self._remove_leg(fid)
+            for row in rows:
+                self._add_leg(row)
+
+    def on_change(self, event, flight_ids):
+        if not event.startswith('flight_'):
+            return
+        with self._lock:
+            if self._changed_during_reload is not None:
+                self._changed_during_reload.update(int(fid) for fid in flight_ids)
+            loaded = self._loaded
+        if loaded:
+            self.refresh_flights(flight_ids)
+
+    def _departures_between(self, airport_code, start, end):
+        deps = self._departures.get(airport_code, [])
+        i = bisect.bisect_left(deps, (start, -1))
+        while i < len(deps) and deps[i][0] < end:
+            yield self._legs[deps[i][1]]
+            i += 1
+
+    def search(self, origin, destination, date, max_stops=MAX_STOPS,
+               min_connection=timedelta(minutes=MIN_CONNECTION_MINUTES),
+               max_duration=timedelta(hours=MAX_TOTAL_HOURS), limit=20):
+        """Finds itineraries with 1..max_stops connections departing origin on date, ranked by total price and then total duration"""
+        self._ensure_loaded()
+        day_start = datetime.strptime(date, '%Y-%m-%d')
+        itineraries = []
+
+        with self._lock:
+            origin_codes = self._city_codes.get(origin, set())
+            dest_codes = self._city_codes.get(destination, set())
+            if not origin_codes or not dest_codes:
+                return []
+
+            def extend(path, visited, price):
+                last = path[-1]
+                first_dep = path[0]['departure_time']
+                if last['destination_code'] in dest_codes:
+                    if len(path) > 1:
+                        itineraries.append((price, last['arrival_time'] - first_dep, list(path)))
+                    return
+                if len(path) > max_stops:
+                    return
+                latest_arrival = first_dep + max_duration
+                for nxt in self._departures_between(last['destination_code'],
+                                                    last['arrival_time'] + min_connection, latest_arrival):
+                    if nxt['destination_code'] in visited or nxt['arrival_time'] > latest_arrival:
+                        continue
+                    path.append(nxt)
+                    visited.add(nxt['destination_code'])
+                    extend(path, visited, price + nxt['price'])
+                    visited.discard(nxt['destination_code'])
+                    path.pop()
+
+            for code in origin_codes:
+                for leg in self._departures_between(code, day_start, day_start + timedelta(days=1)):
+                    extend([leg], {code, leg['destination_code']}, leg['price'])
+
+        itineraries.sort(key=lambda it: (it[0], it[1]))
+        return [{
+            'legs': [dict(leg) for leg in legs],
+            'stops': len(legs) - 1,
+            'total_price': total_price,
+            'total_duration_minutes': int(duration.total_seconds() // 60),
+            'departure_time': legs[0]['departure_time'],
+            'arrival_time': legs[-1]['arrival_time']
+        } for total_price, duration, legs in itineraries[:limit]]
+
+timetable = Timetable()
+db.add_change_listener(timetable.on_change)
+# A forked worker starts with an empty timetable and fresh locks and loads its own on first search
+after_fork(timetable.__init__)
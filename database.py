@@ -1,64 +1,530 @@
+import os
+import re
+import threading
+import time
+import functools
+from contextlib import contextmanager
 import mysql.connector
+from mysql.connector import pooling
 from datetime import datetime, timedelta
+from statements import StatementRegistry
+from rows import FlightRow, ManagerFlightRow, BookingRow, TicketRow, CrewRow
+
+DB_CONFIG = {
+    "host": os.environ.get("FLYTAU_DB_HOST", "localhost"),
+    "user": os.environ.get("FLYTAU_DB_USER", "root"),
+    "password": os.environ.get("FLYTAU_DB_PASSWORD", "root"),
+    "database": os.environ.get("FLYTAU_DB_NAME", "flytau"),
+    "port": int(os.environ.get("FLYTAU_DB_PORT", 3306)),
+    # Client-side bound on connecting and on every socket read, above the largest query budget so the server times out first
+    "connection_timeout": int(os.environ.get("FLYTAU_DB_TIMEOUT", 10))
+}
+POOL_SIZE = int(os.environ.get("FLYTAU_DB_POOL_SIZE", 10))
+# Worker threads a search page fans its independent lookups out to; each holds a pooled connection while it runs, so
+# every pool gets this many connections on top of POOL_SIZE and the workers never starve the request threads
+FANOUT_WORKERS = int(os.environ.get("FLYTAU_FANOUT_WORKERS", 6))
+POOL_WAIT_SECONDS = 5
+CONNECT_RETRY_SECONDS = 5
+
+# Read replicas as a comma-separated list of host[:port], sharing the primary's credentials and schema name
+REPLICA_CONFIGS = [
+    {**DB_CONFIG, "host": host.partition(":")[0], "port": int(host.partition(":")[2] or DB_CONFIG["port"])}
+    for host in (h.strip() for h in os.environ.get("FLYTAU_DB_REPLICAS", "").split(",")) if host
+]
+REPLICA_RETRY_SECONDS = 30
+
+# Time budget per query class, enforced server-side by a MAX_EXECUTION_TIME hint on the statement's top-level SELECT
+QUERY_BUDGETS_MS = {
+    'search': int(os.environ.get("FLYTAU_SEARCH_BUDGET_MS", 2000)),
+    'history': int(os.environ.get("FLYTAU_HISTORY_BUDGET_MS", 3000)),
+    'availability': int(os.environ.get("FLYTAU_AVAILABILITY_BUDGET_MS", 5000)),
+}
+
+def with_budget(query, query_class):
+    """Adds the query class's MAX_EXECUTION_TIME optimizer hint to a SELECT statement"""
+    return re.sub(r'^(\s*)SELECT\b', rf'\1SELECT /*+ MAX_EXECUTION_TIME({QUERY_BUDGETS_MS[query_class]}) */',
+                  query, count=1, flags=re.IGNORECASE)
+
+DEFAULT_LOCATION = 'TLV'
+
+# Resource type (as used by the manager forms) -> (table, primary key column)
+RESOURCE_TABLES = {
+    'pilot': ('pilots', 'id_worker'),
+    'attendant': ('flight_attendants', 'id_worker'),
+    'aircraft': ('planes', 'id_plane'),
+}
+
+# "My bookings" tab -> SQL condition over bookings b / flights f; departed bookings are moved to 'Completed' by the scheduler
+BOOKING_TABS = {
+    'Confirmed': "b.status = 'Confirmed'",
+    'Completed': "b.status = 'Completed'",
+    'Cancelled_Client': "b.status = 'Cancelled_Client'",
+    'Cancelled_System': "b.status = 'Cancelled_System'",
+}
+
+# A flight can only be cancelled by a manager at least this long before departure
+CANCEL_NOTICE_HOURS = 72
+
+# Tables maintained by the application itself on top of the base 'flytau' schema
+EXTRA_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS resource_positions (
+        resource_type VARCHAR(10) NOT NULL,
+        resource_id VARCHAR(32) NOT NULL,
+        valid_from DATETIME NOT NULL,
+        location VARCHAR(10) NOT NULL,
+        id_flight INT NOT NULL,
+        PRIMARY KEY (resource_type, resource_id, valid_from, id_flight),
+        KEY idx_positions_flight (id_flight),
+        KEY idx_positions_time (valid_from)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id_job INT AUTO_INCREMENT PRIMARY KEY,
+        job_type VARCHAR(50) NOT NULL,
+        payload TEXT NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'Queued',
+        progress INT NOT NULL DEFAULT 0,
+        attempts INT NOT NULL DEFAULT 0,
+        max_attempts INT NOT NULL DEFAULT 3,
+        result TEXT NULL,
+        error TEXT NULL,
+        parent_job INT NULL,
+        created_by VARCHAR(50) NULL,
+        claimed_by VARCHAR(100) NULL,
+        heartbeat_at DATETIME NULL,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL,
+        run_after DATETIME NOT NULL,
+        KEY idx_jobs_queue (status, run_after)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS notification_outbox (
+        id_notification INT AUTO_INCREMENT PRIMARY KEY,
+        id_booking INT NOT NULL,
+        email VARCHAR(255) NOT NULL,
+        kind VARCHAR(50) NOT NULL,
+        message TEXT NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'Pending',
+        id_job INT NULL,
+        created_at DATETIME NOT NULL,
+        sent_at DATETIME NULL,
+        UNIQUE KEY uq_outbox_booking_kind (id_booking, kind),
+        KEY idx_outbox_status (status)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS scheduled_task_runs (
+        task_name VARCHAR(100) PRIMARY KEY,
+        last_run_at DATETIME NOT NULL
+    )
+    """,
+]
+
+# Secondary indexes on base tables; MySQL has no CREATE INDEX IF NOT EXISTS, so "duplicate key name" is ignored
+EXTRA_INDEXES = [
+    "CREATE INDEX idx_bookings_status ON bookings (status)",
+    "CREATE INDEX idx_flights_departure ON flights (departure_time)",
+    *(f"CREATE INDEX idx_{table}_updated ON {table} (updated_at)"
+      for table in ('flights', 'flights_archive', 'bookings', 'bookings_archive')),
+]
+ER_DUP_KEYNAME = 1061
+
+# Columns added to existing tables; MySQL has no ADD COLUMN IF NOT EXISTS, so "duplicate column name" is ignored
+EXTRA_COLUMNS = [
+    "ALTER TABLE jobs ADD COLUMN claimed_by VARCHAR(100) NULL",
+    "ALTER TABLE jobs ADD COLUMN heartbeat_at DATETIME NULL",
+    # Change watermark for the analytics snapshot; archive tables get it too so archiving can keep copying with SELECT *
+    *(f"ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"
+      for table in ('flights', 'flights_archive', 'bookings', 'bookings_archive')),
+]
+ER_DUP_FIELDNAME = 1060
+
+COMPLETION_BATCH_SIZE = 500
+
+# Archive tier: rows of departed flights with no open bookings move to <table>_archive, created with the live table's layout.
+# Listed parents first, so copying runs in this order and deleting in reverse.
+ARCHIVE_TABLES = [
+    ('flights', 'id_flight'),
+    ('flight_pricing', 'id_flight'),
+    ('pilots_in_flights', 'id_flight'),
+    ('flight_attendants_in_flights', 'id_flight'),
+    ('bookings', 'id_booking'),
+    ('tickets', 'id_flight'),
+]
+ARCHIVE_AFTER_DAYS = int(os.environ.get('FLYTAU_ARCHIVE_AFTER_DAYS', 180))
+ARCHIVE_BATCH_SIZE = 200
+
+FLIGHT_DATA_QUERY = with_budget("""
+    SELECT f.id_flight, 
+           f.departure_time, 
+           -- התיקון כאן: מחשבים את זמן ההגעה במקום לשלוף שדה שלא קיים
+           ADDTIME(f.departure_time, r.duration) AS arrival_time, 
+           f.flight_status,
+           a1.city as origin, 
+           a2.city as destination,
+           MIN(p.price) as min_price
+    FROM flights f
+    JOIN routes r ON f.id_route = r.id_route
+    JOIN airports a1 ON r.origin_code = a1.airport_code
+    JOIN airports a2 ON r.destination_code = a2.airport_code
+    JOIN flight_pricing p ON f.id_flight = p.id_flight
+""", 'search')
+
+# Hot lookups run on every seat-selection and login request: prepared once per pooled connection and reused (see statements.py).
+# Pooled connections are therefore not session-reset on release, which would drop the prepared handles; release_connection rolls back instead.
+HOT_STATEMENTS = {
+    'flight_data_by_id': FLIGHT_DATA_QUERY + " WHERE f.id_flight = %s GROUP BY f.id_flight",
+    'flight_prices': "SELECT class_type, price FROM flight_pricing WHERE id_flight = %s",
+    'occupied_seats': """
+        SELECT t.class_type, t.`row_number`, t.seat_letter
+        FROM tickets t
+        JOIN bookings b ON b.id_booking = t.id_booking
+        WHERE t.id_flight = %s AND b.status = 'confirmed'
+    """,
+    'plane_for_seatmap': """
+        SELECT p.id_plane, p.manufacturer, p.size, p.purchase_date
+        FROM flights f
+        JOIN planes p on p.id_plane = f.id_plane
+        WHERE f.id_flight = %s
+    """,
+    'user_login': """
+        SELECT c.email, c.first_name_eng 
+        FROM customers c
+        JOIN registered_customers rc ON c.email = rc.customers_email
+        WHERE c.email = %s AND rc.password = %s
+    """,
+}
+
+def after_fork(callback):
+    """Runs callback in every child process forked from this one, e.g. prefork server workers; a no-op where fork is unavailable"""
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=callback)
+
+def replica_read(method):
+    """Runs a lag-tolerant read method on a replica connection, retrying on the primary if the replica fails"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        local = self._local
+        if not self._replicas or getattr(local, 'reading', False) or getattr(local, 'primary_only', 0):
+            return method(self, *args, **kwargs)
+        local.reading = True
+        try:
+            return method(self, *args, **kwargs)
+        except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError) as err:
+            if getattr(local, 'replica', None) is None:
+                raise
+            print(f"Replica read failed, retrying on primary: {err}")
+            self._drop_replica(mark_down=True)
+            local.reading = False
+            return method(self, *args, **kwargs)
+        finally:
+            local.reading = False
+    return wrapper
 
 class Database:
     _instance = None
+    _listeners = []
+    _inherited = []
 
     def __new__(cls):
-        """Ensures a single global instance of the Database class by intercepting object creation and establishing a persistent connection to the 'flytau' schema"""
+        """Ensures a single global instance of the Database class; connections are opened lazily"""
         if cls._instance is None:
             cls._instance = super(Database, cls).__new__(cls)
+            cls._instance._reset_process_state()
+        return cls._instance
+
+    def _reset_process_state(self):
+        """Starts this process's connection state from scratch: no pools yet, fresh thread-locals, prepared-statement cache and locks"""
+        self._pid = os.getpid()
+        self._pool = None
+        self._connect_failed_at = None
+        self._connect_lock = threading.Lock()
+        self._schema_ready = False
+        self._schema_failed_at = None
+        self._schema_lock = threading.Lock()
+        self._local = threading.local()
+        self._statements = StatementRegistry(HOT_STATEMENTS)
+        self._replicas = []
+        self._replica_down_until = []
+        self._next_replica = 0
+        self._replica_lock = threading.Lock()
+
+    @classmethod
+    def _after_fork_in_child(cls):
+        """Sets the inherited pools aside in a forked child so it opens its own"""
+        db = cls._instance
+        if db is not None and db._pid != os.getpid():
+            cls._inherited.append((db._pool, db._replicas, db._local))
+            db._reset_process_state()
+
+    def _connect(self):
+        """Returns this process's primary pool, creating the pools on first use; None while the database is unreachable"""
+        if self._pool is not None:
+            if not self._schema_ready:
+                self._prepare_schema()
+            return self._pool
+        with self._connect_lock:
+            if self._pool is not None:
+                return self._pool
+            if self._connect_failed_at is not None and time.monotonic() - self._connect_failed_at < CONNECT_RETRY_SECONDS:
+                return None
             try:
-                cls._instance.connection = mysql.connector.connect(
-                    host="localhost",
-                    user="root",
-                    password="root",
-                    database="flytau",
-                    port=3306
-                )
-                print("Connected to 'flytau' database (Singleton)")
+                pool = pooling.MySQLConnectionPool(
+                    pool_name=f"flytau_{os.getpid()}", pool_size=POOL_SIZE + FANOUT_WORKERS, pool_reset_session=False,
+                    **DB_CONFIG)
             except mysql.connector.Error as err:
                 print(f"Connection Error: {err}")
-                cls._instance.connection = None
-        return cls._instance
+                self._connect_failed_at = time.monotonic()
+                return None
+            print(f"Connected to 'flytau' database (pid {os.getpid()}, pool of {POOL_SIZE + FANOUT_WORKERS})")
+            for i, config in enumerate(REPLICA_CONFIGS):
+                try:
+                    self._replicas.append(pooling.MySQLConnectionPool(
+                        pool_name=f"flytau_{os.getpid()}_replica{i}", pool_size=POOL_SIZE + FANOUT_WORKERS,
+                        pool_reset_session=False, **config))
+                    self._replica_down_until.append(0.0)
+                    print(f"Connected to read replica {config['host']}:{config['port']}")
+                except mysql.connector.Error as err:
+                    print(f"Replica Connection Error ({config['host']}): {err}")
+            self._pool = pool
+        self._prepare_schema()
+        return pool
+
+    def _prepare_schema(self):
+        """Runs ensure_extra_schema() once per process on a separate primary connection"""
+        if self._schema_failed_at is not None and time.monotonic() - self._schema_failed_at < CONNECT_RETRY_SECONDS:
+            return
+        if not self._schema_lock.acquire(blocking=False):
+            return
+        local = self._local
+        saved = (getattr(local, 'connection', None), getattr(local, 'reading', False))
+        local.connection, local.reading = None, False
+        try:
+            if not self._schema_ready:
+                self.ensure_extra_schema()
+                self._schema_ready = True
+        except mysql.connector.Error as err:
+            print(f"Error preparing schema: {err}")
+            self._schema_failed_at = time.monotonic()
+        finally:
+            conn = getattr(local, 'connection', None)
+            local.connection, local.reading = saved
+            if conn is not None:
+                try:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    conn.close()
+                except mysql.connector.Error as err:
+                    print(f"Error releasing connection: {err}")
+            self._schema_lock.release()
+
+    @property
+    def connection(self):
+        """The calling thread's pooled connection (its replica connection inside a @replica_read method)"""
+        if getattr(self._local, 'reading', False):
+            replica = self._replica_connection()
+            if replica is not None:
+                return replica
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = self._acquire()
+            self._local.connection = conn
+        return conn
+
+    def _acquire(self):
+        """Takes a connection from the pool, waiting up to POOL_WAIT_SECONDS for one to be returned"""
+        pool = self._connect()
+        if pool is None:
+            raise mysql.connector.errors.InterfaceError("Database is unreachable")
+        deadline = time.monotonic() + POOL_WAIT_SECONDS
+        while True:
+            try:
+                return pool.get_connection()
+            except pooling.PoolError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def _replica_connection(self):
+        """The calling thread's replica connection, taken round-robin from the replicas not marked down; None when none is available"""
+        conn = getattr(self._local, 'replica', None)
+        if conn is not None:
+            return conn
+        self._connect()
+        for _ in range(len(self._replicas)):
+            with self._replica_lock:
+                index = self._next_replica
+                self._next_replica = (index + 1) % len(self._replicas)
+            if self._replica_down_until[index] > time.monotonic():
+                continue
+            try:
+                conn = self._replicas[index].get_connection()
+            except pooling.PoolError:
+                continue
+            except mysql.connector.Error as err:
+                print(f"Replica {index} unavailable, failing over: {err}")
+                self._replica_down_until[index] = time.monotonic() + REPLICA_RETRY_SECONDS
+                continue
+            self._local.replica = conn
+            self._local.replica_index = index
+            return conn
+        return None
+
+    def _drop_replica(self, mark_down=False):
+        """Discards the calling thread's replica connection, optionally keeping its replica out of rotation for REPLICA_RETRY_SECONDS"""
+        conn = getattr(self._local, 'replica', None)
+        if conn is None:
+            return
+        self._local.replica = None
+        if mark_down:
+            self._replica_down_until[self._local.replica_index] = time.monotonic() + REPLICA_RETRY_SECONDS
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    @contextmanager
+    def primary_only(self):
+        """Sends every read of the calling thread to the primary while the block runs, for checks that must see the latest writes"""
+        self._local.primary_only = getattr(self._local, 'primary_only', 0) + 1
+        try:
+            yield
+        finally:
+            self._local.primary_only -= 1
+
+    def iter_query(self, query, params=(), batch_size=500):
+        """Streams a query's rows from an unbuffered server-side cursor on a connection borrowed only for the duration of the iteration, so memory stays constant regardless of the result size"""
+        conn = self._acquire()
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        finished = False
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    finished = True
+                    break
+                yield from rows
+        finally:
+            try:
+                if not finished:
+                    while cursor.fetchmany(batch_size):
+                        pass
+                cursor.close()
+            except mysql.connector.Error as err:
+                print(f"Error closing streaming cursor: {err}")
+            conn.close()
+
+    def release_connection(self):
+        """Returns the calling thread's primary and replica connections to their pools, ending any open transaction"""
+        for slot in ('connection', 'replica'):
+            conn = getattr(self._local, slot, None)
+            if conn is None:
+                continue
+            setattr(self._local, slot, None)
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.close()
+            except mysql.connector.Error as err:
+                print(f"Error releasing connection: {err}")
+
+    def ensure_extra_schema(self):
+        """Creates the application-maintained tables if missing and backfills the position ledger the first time it is created"""
+        cursor = self.connection.cursor()
+        try:
+            for statement in EXTRA_SCHEMA:
+                cursor.execute(statement)
+            for table, _ in ARCHIVE_TABLES:
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS {table}_archive LIKE {table}")
+            for statement in EXTRA_COLUMNS:
+                try:
+                    cursor.execute(statement)
+                except mysql.connector.Error as err:
+                    if err.errno != ER_DUP_FIELDNAME:
+                        raise
+            for statement in EXTRA_INDEXES:
+                try:
+                    cursor.execute(statement)
+                except mysql.connector.Error as err:
+                    if err.errno != ER_DUP_KEYNAME:
+                        raise
+            cursor.execute("SELECT EXISTS(SELECT 1 FROM resource_positions)")
+            ledger_empty = not cursor.fetchone()[0]
+            self.connection.commit()
+        finally:
+            cursor.close()
+        if ledger_empty:
+            self.rebuild_position_ledger()
+
+    def _tier(self, table, include_archive=False):
+        """Table reference for a query: the live table alone, or its live and archived rows together"""
+        if not include_archive:
+            return table
+        return f"(SELECT * FROM {table} UNION ALL SELECT * FROM {table}_archive)"
+
+    def _fetch_rows(self, row_cls, query, params=()):
+        """Runs a read query on a plain tuple cursor and wraps each result in a slotted row class; the selected columns must match the class fields in order"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            if tuple(cursor.column_names) != row_cls.fields:
+                raise ValueError(f"{row_cls.__name__} expects columns {row_cls.fields}, got {tuple(cursor.column_names)}")
+            return [row_cls(*values) for values in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def _execute_prepared(self, name, params=()):
+        """Runs one of the HOT_STATEMENTS on the calling thread's connection through its prepared cursor; returns (column names, row tuples)"""
+        return self._statements.execute(self.connection, name, params)
+
+    def statement_stats(self):
+        """Per-statement execution stats of the prepared hot statements"""
+        return self._statements.stats()
+
+    def add_change_listener(self, callback):
+        """Registers a callback that is invoked as callback(event, ids) after a change has been committed; 'flight_*' events carry flight IDs, 'booking_*' events booking IDs and 'resource_*' events plane or worker IDs"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def _notify_change(self, event, ids):
+        """Propagates a committed change to every registered in-memory structure, isolating failures of individual listeners"""
+        for callback in list(self._listeners):
+            try:
+                callback(event, list(ids))
+            except Exception as e:
+                print(f"Error in change listener for {event}: {e}")
 
 # --- Section 1: Booking Lifecycle ---
 
+    @replica_read
     def get_all_destinations(self):
-        """Retrieves a unique list of all available flight destinations, including city, country, and airport names, sorted alphabetically by city"""
-        query = "SELECT DISTINCT city, country, airport_name FROM airports ORDER BY city"
+        """Retrieves a unique list of all available flight destinations, including city, country, airport names and codes, sorted alphabetically by city"""
+        query = with_budget("SELECT DISTINCT city, country, airport_name, airport_code FROM airports ORDER BY city", 'search')
         cursor = self.connection.cursor(dictionary=True)
         cursor.execute(query)
         res = cursor.fetchall()
         cursor.close()
         return res
 
+    @replica_read
     def get_flight_data(self, date_str=None, origin=None, destination=None, flight_id=None):
         """dynamically filtering results based on date, origin, destination, or flight ID, while calculating arrival times and identifying the lowest available price"""
-        cursor = self.connection.cursor(dictionary=True)
-        query = """
-            SELECT f.id_flight, 
-                   f.departure_time, 
-                   -- התיקון כאן: מחשבים את זמן ההגעה במקום לשלוף שדה שלא קיים
-                   ADDTIME(f.departure_time, r.duration) AS arrival_time, 
-                   f.flight_status,
-                   a1.city as origin, 
-                   a2.city as destination,
-                   MIN(p.price) as min_price
-            FROM flights f
-            JOIN routes r ON f.id_route = r.id_route
-            JOIN airports a1 ON r.origin_code = a1.airport_code
-            JOIN airports a2 ON r.destination_code = a2.airport_code
-            JOIN flight_pricing p ON f.id_flight = p.id_flight
-        """
+        if flight_id and not (date_str or origin or destination):
+            columns, rows = self._execute_prepared('flight_data_by_id', (flight_id,))
+            return [FlightRow(*values) for values in rows]
+        query = FLIGHT_DATA_QUERY
         params = []
         conditions = []
         if flight_id:
             conditions.append("f.id_flight = %s")
             params.append(flight_id)
         if date_str:
-            conditions.append("DATE(f.departure_time) = %s")
-            params.append(date_str)
+            conditions.append("f.departure_time >= %s AND f.departure_time < %s + INTERVAL 1 DAY")
+            params.extend([date_str, date_str])
         if origin:
             conditions.append("a1.city = %s")
             params.append(origin)
@@ -68,12 +534,9 @@ class Database:
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
         query += " GROUP BY f.id_flight"
+        return self._fetch_rows(FlightRow, query, params)
 
-        cursor.execute(query, params)
-        res = cursor.fetchall()
-        cursor.close()
-        return res
-
+    @replica_read
     def get_nearest_flight_date(self, origin, dest, target_date, after=False):
         """Retrieving the nearest flight date for a specific route"""
         operator = ">=" if after else "!="
@@ -94,72 +557,164 @@ class Database:
         cursor = self.connection.cursor(dictionary=True)
         try:
             if not after:
-                cursor.execute(query, (origin, dest, target_date, target_date))
+                cursor.execute(with_budget(query, 'search'), (origin, dest, target_date, target_date))
             else:
-                cursor.execute(query, (origin, dest, target_date))
+                cursor.execute(with_budget(query, 'search'), (origin, dest, target_date))
 
             res = cursor.fetchone()
             return res['flight_date'].strftime('%Y-%m-%d') if res else None
-        except Exception as e:
-            print(f"Error in get_nearest_flight_date: {e}")
-            return None
         finally:
             cursor.close()
 
-    def get_plane_details_for_seatmap(self, flight_id):
-        """Retrieving aircraft details and size by flight"""
+    @replica_read
+    def get_fare_calendar(self, origin, dest, start_date, end_date):
+        """Aggregating the lowest fare per departure day for a route over a date window in a single grouped query"""
         query = """
-                SELECT p.id_plane, p.manufacturer, p.size, p.purchase_date
-                FROM flights f
-                         JOIN planes p on p.id_plane = f.id_plane
-                WHERE f.id_flight = %s \
-                """
+            SELECT DATE(f.departure_time) AS flight_date,
+                   MIN(p.price) AS min_price,
+                   COUNT(DISTINCT f.id_flight) AS flights_count
+            FROM flights f
+            JOIN routes r ON f.id_route = r.id_route
+            JOIN airports a1 ON r.origin_code = a1.airport_code
+            JOIN airports a2 ON r.destination_code = a2.airport_code
+            JOIN flight_pricing p ON f.id_flight = p.id_flight
+            WHERE a1.city = %s AND a2.city = %s
+              AND f.flight_status != 'Cancelled'
+              AND f.departure_time >= %s AND f.departure_time < %s
+            GROUP BY DATE(f.departure_time)
+        """
         cursor = self.connection.cursor(dictionary=True)
         try:
-            cursor.execute(query, (flight_id,))
-            return cursor.fetchone()
+            cursor.execute(with_budget(query, 'search'), (origin, dest, start_date, end_date + timedelta(days=1)))
+            return cursor.fetchall()
         finally:
             cursor.close()
 
-    def get_class_dimensions(self, plane_id):
-        """Retrieving the number of rows and columns for each cabin class"""
-        query = "SELECT class_type, num_rows, num_cols FROM classes WHERE id_plane = %s"
+    @replica_read
+    def get_round_trip_pairs(self, origin, dest, date_str, return_date_str, limit=10):
+        """Pairing outbound and return flights in one query, keeping only returns that depart after the outbound arrival, ranked by combined price and trip length"""
+        leg_query = """
+            SELECT f.id_flight, f.departure_time,
+                   ADDTIME(f.departure_time, r.duration) AS arrival_time,
+                   MIN(p.price) AS min_price
+            FROM flights f
+            JOIN routes r ON f.id_route = r.id_route
+            JOIN airports a1 ON r.origin_code = a1.airport_code
+            JOIN airports a2 ON r.destination_code = a2.airport_code
+            JOIN flight_pricing p ON f.id_flight = p.id_flight
+            WHERE a1.city = %s AND a2.city = %s
+              AND f.flight_status != 'Cancelled'
+              AND f.departure_time >= %s AND f.departure_time < DATE_ADD(%s, INTERVAL 1 DAY)
+            GROUP BY f.id_flight
+        """
+        query = f"""
+            SELECT o.id_flight AS outbound_id, o.departure_time AS outbound_departure,
+                   o.arrival_time AS outbound_arrival, o.min_price AS outbound_price,
+                   rt.id_flight AS return_id, rt.departure_time AS return_departure,
+                   rt.arrival_time AS return_arrival, rt.min_price AS return_price,
+                   o.min_price + rt.min_price AS total_price,
+                   TIMESTAMPDIFF(MINUTE, o.departure_time, rt.arrival_time) AS trip_minutes
+            FROM ({leg_query}) o
+            JOIN ({leg_query}) rt ON rt.departure_time > o.arrival_time
+            ORDER BY total_price ASC, trip_minutes ASC
+            LIMIT %s
+        """
+        params = (origin, dest, date_str, date_str, dest, origin, return_date_str, return_date_str, int(limit))
         cursor = self.connection.cursor(dictionary=True)
         try:
-            cursor.execute(query, (plane_id,))
+            cursor.execute(with_budget(query, 'search'), params)
             return cursor.fetchall()
         finally:
             cursor.close()
 
-    def get_flight_prices(self, flight_id):
-        """Retrieving the flight price list"""
-        query = ("SELECT class_type, price "
-                 "FROM flight_pricing "
-                 "WHERE id_flight = %s")
+    def get_fare_matrix_rows(self, flight_ids=None):
+        """Retrieving the lowest fare of every upcoming, non-cancelled flight (or of specific flights) together with its route endpoints"""
+        query = """
+            SELECT f.id_flight, f.departure_time,
+                   a1.city AS origin_city,
+                   a2.city AS destination_city, a2.country AS destination_country,
+                   MIN(p.price) AS min_price
+            FROM flights f
+            JOIN routes r ON f.id_route = r.id_route
+            JOIN airports a1 ON r.origin_code = a1.airport_code
+            JOIN airports a2 ON r.destination_code = a2.airport_code
+            JOIN flight_pricing p ON f.id_flight = p.id_flight
+            WHERE f.flight_status != 'Cancelled'
+        """
+        params = []
+        if flight_ids:
+            query += " AND f.id_flight IN (" + ", ".join(["%s"] * len(flight_ids)) + ")"
+            params.extend(flight_ids)
+        else:
+            query += " AND f.departure_time >= CURDATE()"
+        query += " GROUP BY f.id_flight"
+
         cursor = self.connection.cursor(dictionary=True)
         try:
-            cursor.execute(query, (flight_id,))
-            res = cursor.fetchall()
-            return {row['class_type']: float(row['price']) for row in res}
+            cursor.execute(query, params)
+            return cursor.fetchall()
         finally:
             cursor.close()
 
-    def get_occupied_seats(self, flight_id):
-        """Retrieving occupied seats only"""
+    def get_timetable_rows(self, flight_ids=None):
+        """Retrieving departure, arrival, airports and lowest fare of every upcoming, non-cancelled flight (or of specific flights) for the connection timetable"""
         query = """
-                SELECT t.class_type, t.`row_number`, t.seat_letter
-                FROM tickets t
-                         JOIN bookings b ON b.id_booking = t.id_booking
-                WHERE t.id_flight = %s \
-                  AND b.status = 'confirmed'
-                """
+            SELECT f.id_flight, f.departure_time,
+                   ADDTIME(f.departure_time, r.duration) AS arrival_time,
+                   r.origin_code, a1.city AS origin_city,
+                   r.destination_code, a2.city AS destination_city,
+                   MIN(p.price) AS min_price
+            FROM flights f
+            JOIN routes r ON f.id_route = r.id_route
+            JOIN airports a1 ON r.origin_code = a1.airport_code
+            JOIN airports a2 ON r.destination_code = a2.airport_code
+            JOIN flight_pricing p ON f.id_flight = p.id_flight
+            WHERE f.flight_status != 'Cancelled'
+        """
+        params = []
+        if flight_ids:
+            query += " AND f.id_flight IN (" + ", ".join(["%s"] * len(flight_ids)) + ")"
+            params.extend(flight_ids)
+        else:
+            query += " AND f.departure_time >= CURDATE()"
+        query += " GROUP BY f.id_flight"
+
         cursor = self.connection.cursor(dictionary=True)
         try:
-            cursor.execute(query, (flight_id,))
+            cursor.execute(query, params)
             return cursor.fetchall()
         finally:
             cursor.close()
 
+    @replica_read
+    def get_plane_details_for_seatmap(self, flight_id):
+        """Retrieving aircraft details and size by flight"""
+        columns, rows = self._execute_prepared('plane_for_seatmap', (flight_id,))
+        return dict(zip(columns, rows[0])) if rows else None
+
+    @replica_read
+    def get_class_dimensions(self, plane_id):
+        """Retrieving the number of rows and columns for each cabin class"""
+        query = "SELECT class_type, num_rows, num_cols FROM classes WHERE id_plane = %s"
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            cursor.execute(query, (plane_id,))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    @replica_read
+    def get_flight_prices(self, flight_id):
+        """Retrieving the flight price list"""
+        columns, rows = self._execute_prepared('flight_prices', (flight_id,))
+        return {class_type: float(price) for class_type, price in rows}
+
+    @replica_read
+    def get_occupied_seats(self, flight_id):
+        """Retrieving occupied seats only"""
+        columns, rows = self._execute_prepared('occupied_seats', (flight_id,))
+        return [dict(zip(columns, values)) for values in rows]
+
     def create_new_booking(self, user_email, is_registered, total_price, flight_id, passengers):
         from utils import calculate_next_booking_id
         """"Processes flight bookings by validating flight data, handling guest or registered users, and committing booking and ticket records to the database"""
@@ -239,19 +794,8 @@ class Database:
 
     def user_login(self, email, password):
         """verifying credentials against the database and retrieving profile details for session initialization"""
-        query = """
-            SELECT c.email, c.first_name_eng 
-            FROM customers c
-            JOIN registered_customers rc ON c.email = rc.customers_email
-            WHERE c.email = %s AND rc.password = %s
-        """
-        cursor = self.connection.cursor(dictionary=True)
-        try:
-            cursor.execute(query, (email, password))
-            result = cursor.fetchone()
-            return result
-        finally:
-            cursor.close()
+        columns, rows = self._execute_prepared('user_login', (email, password))
+        return dict(zip(columns, rows[0])) if rows else None
 
     def manager_login(self, id_worker, password):
         """validating manager credentials and retrieving profile information for authorized sessions"""
@@ -330,6 +874,7 @@ class Database:
 
 # --- Section 3: Customer Actions ---
 
+    @replica_read
     def get_single_booking(self, email, booking_id):
         """Fetches detailed information for a specific booking ID linked to either customer or registered email."""
         query = """
@@ -352,31 +897,61 @@ class Database:
         finally:
             cursor.close()
 
-    def get_customer_bookings(self, email):
-        """Retrieves a comprehensive booking history for a specific registered user, aggregating flight schedules, route information, and individual ticket details into a single, chronologically ordered result set"""
-        query = """
-            SELECT 
-                b.id_booking, b.booking_date, b.status as booking_status, b.total_price,
-                f.id_flight, f.departure_time,
-                r.origin_code, a1.city as origin_city,
-                r.destination_code, a2.city as destination_city,
-                t.passenger_name, t.passenger_passport, t.seat_letter, t.`row_number`, t.class_type
-            FROM bookings b
-            JOIN tickets t ON b.id_booking = t.id_booking
-            JOIN flights f ON t.id_flight = f.id_flight
+    def _customer_bookings_from(self, include_archive=False):
+        """FROM clause with one row per booking of a registered user: its flight, route cities and passenger count"""
+        bookings = self._tier('bookings', include_archive)
+        return f"""
+            FROM {bookings} b
+            JOIN (SELECT t.id_booking, MIN(t.id_flight) AS id_flight, COUNT(*) AS passengers
+                  FROM {self._tier('tickets', include_archive)} t JOIN {bookings} bt ON bt.id_booking = t.id_booking
+                  WHERE bt.registered_email = %s
+                  GROUP BY t.id_booking) bf ON bf.id_booking = b.id_booking
+            JOIN {self._tier('flights', include_archive)} f ON bf.id_flight = f.id_flight
             JOIN routes r ON f.id_route = r.id_route
             JOIN airports a1 ON r.origin_code = a1.airport_code
             JOIN airports a2 ON r.destination_code = a2.airport_code
-            WHERE b.registered_email = %s
-            ORDER BY f.departure_time DESC
         """
+
+    @replica_read
+    def get_customer_booking_counts(self, email, include_archive=False):
+        """Counts a registered user's bookings per history tab in a single aggregate query"""
+        sums = ", ".join(f"COALESCE(SUM({cond}), 0) AS `{tab}`" for tab, cond in BOOKING_TABS.items())
+        query = with_budget(f"SELECT {sums} {self._customer_bookings_from(include_archive)}", 'history')
         cursor = self.connection.cursor(dictionary=True)
         try:
             cursor.execute(query, (email,))
-            return cursor.fetchall()
+            row = cursor.fetchone() or {}
+            return {tab: int(row.get(tab) or 0) for tab in BOOKING_TABS}
         finally:
             cursor.close()
 
+    @replica_read
+    def get_customer_bookings_page(self, email, tab, offset=0, limit=10, include_archive=False):
+        """One page of a registered user's bookings in a history tab, one summary row per booking; upcoming trips are listed soonest first, the rest most recent first"""
+        order = "ASC" if tab == 'Confirmed' else "DESC"
+        query = f"""
+            SELECT b.id_booking, b.booking_date, %s AS booking_status, b.total_price,
+                   f.id_flight, f.departure_time, a1.city AS origin_city, a2.city AS destination_city,
+                   bf.passengers
+            {self._customer_bookings_from(include_archive)}
+            WHERE {BOOKING_TABS[tab]}
+            ORDER BY f.departure_time {order}, b.id_booking {order}
+            LIMIT %s OFFSET %s
+        """
+        return self._fetch_rows(BookingRow, with_budget(query, 'history'), (tab, email, int(limit), int(offset)))
+
+    @replica_read
+    def get_booking_tickets(self, email, booking_id, include_archive=False):
+        """Passenger and seat details of one booking, only if it belongs to the given registered user"""
+        query = f"""
+            SELECT t.passenger_name, t.seat_letter, t.`row_number`, t.class_type
+            FROM {self._tier('tickets', include_archive)} t
+            JOIN {self._tier('bookings', include_archive)} b ON b.id_booking = t.id_booking
+            WHERE b.id_booking = %s AND b.registered_email = %s
+            ORDER BY t.`row_number`, t.seat_letter
+        """
+        return self._fetch_rows(TicketRow, query, (booking_id, email))
+
     def get_booking_details_for_cancellation(self, booking_id):
         """Retrieves essential flight departure and pricing data through a multi-table join to validate cancellation eligibility and calculate potential penalties"""
         query = """
@@ -401,6 +976,7 @@ class Database:
         try:
             cursor.execute(query, (new_status, new_price, booking_id))
             self.connection.commit()
+            self._notify_change('booking_updated', [booking_id])
             return True
         except Exception:
             self.connection.rollback()
@@ -408,8 +984,60 @@ class Database:
         finally:
             cursor.close()
 
+    def claim_scheduled_run(self, task_name, interval_seconds):
+        """Records a run of a periodic task unless any process ran it within interval_seconds; True when the caller should run it"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("INSERT IGNORE INTO scheduled_task_runs (task_name, last_run_at) VALUES (%s, '1970-01-01')",
+                           (task_name,))
+            cursor.execute("UPDATE scheduled_task_runs SET last_run_at = NOW() "
+                           "WHERE task_name = %s AND last_run_at <= NOW() - INTERVAL %s SECOND",
+                           (task_name, int(interval_seconds)))
+            claimed = cursor.rowcount == 1
+            self.connection.commit()
+            return claimed
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def complete_departed_bookings(self, batch_size=COMPLETION_BATCH_SIZE):
+        """Moves 'Confirmed' bookings whose flight has departed to 'Completed' in short batched transactions, returning how many bookings changed"""
+        select_query = """
+            SELECT DISTINCT b.id_booking
+            FROM flights f
+            JOIN tickets t ON t.id_flight = f.id_flight
+            JOIN bookings b ON b.id_booking = t.id_booking
+            WHERE f.departure_time <= NOW() AND b.status = 'Confirmed'
+            LIMIT %s
+        """
+        total = 0
+        cursor = self.connection.cursor()
+        try:
+            while True:
+                cursor.execute(select_query, (batch_size,))
+                booking_ids = [row[0] for row in cursor.fetchall()]
+                if not booking_ids:
+                    break
+                placeholders = ", ".join(["%s"] * len(booking_ids))
+                cursor.execute(f"UPDATE bookings SET status = 'Completed' WHERE status = 'Confirmed' AND id_booking IN ({placeholders})",
+                               booking_ids)
+                self.connection.commit()
+                total += cursor.rowcount
+                self._notify_change('booking_updated', booking_ids)
+                if len(booking_ids) < batch_size:
+                    break
+        except Exception as e:
+            self.connection.rollback()
+            print(f"Error completing departed bookings: {e}")
+        finally:
+            cursor.close()
+        return total
+
 # --- Section 4: Management ---
 
+    @replica_read
     def get_all_flights_for_manager(self):
         """aggregating flight schedules, aircraft specifications, and real-time passenger counts through complex multi-table joins and correlated subqueries"""
         query = """
@@ -432,12 +1060,27 @@ class Database:
             JOIN airports air_dest ON r.destination_code = air_dest.airport_code
             ORDER BY f.departure_time DESC
         """
-        cursor = self.connection.cursor(dictionary=True)
-        cursor.execute(query)
-        res = cursor.fetchall()
-        cursor.close()
-        return res
+        return self._fetch_rows(ManagerFlightRow, query)
 
+    @replica_read
+    def get_all_flight_crew(self):
+        """Retrieving the full names of the crew assigned to every flight in one query, one row per assignment, pilots first"""
+        query = """
+            SELECT pif.id_flight, 'Pilot' AS role, CONCAT(p.first_name, ' ', p.last_name) AS full_name
+            FROM pilots_in_flights pif
+            JOIN pilots p ON p.id_worker = pif.id_worker
+            UNION ALL
+            SELECT af.id_flight, 'Attendant' AS role, CONCAT(fa.first_name, ' ', fa.last_name) AS full_name
+            FROM flight_attendants_in_flights af
+            JOIN flight_attendants fa ON fa.id_worker = af.id_worker
+        """
+        try:
+            return self._fetch_rows(CrewRow, query)
+        except Exception as e:
+            print(f"Error getting crew: {e}")
+            return []
+
+    @replica_read
     def get_flight_crew_names(self, flight_id):
         """Retrieving full names of the assigned flight crew"""
         cursor = self.connection.cursor(dictionary=True)
@@ -474,7 +1117,9 @@ class Database:
             cursor.execute(
                 "UPDATE bookings b JOIN tickets t ON b.id_booking = t.id_booking SET b.status = 'Cancelled_System' WHERE t.id_flight = %s",
                 (flight_id,))
+            cursor.execute("DELETE FROM resource_positions WHERE id_flight = %s", (flight_id,))
             self.connection.commit()
+            self._notify_change('flight_cancelled', [flight_id])
             return True, "Flight cancelled successfully."
         except Exception as e:
             self.connection.rollback()
@@ -482,6 +1127,58 @@ class Database:
         finally:
             cursor.close()
 
+    def cancel_flights_bulk(self, flight_ids=None, route_id=None, date_from=None, date_to=None, plane_id=None):
+        """Cancels every scheduled flight matching the given IDs and/or filters that departs more than CANCEL_NOTICE_HOURS from now in one set-based transaction, marking their confirmed bookings 'Cancelled_System' and returning the affected counts and the skipped IDs"""
+        conditions = ["flight_status = 'Scheduled'", "departure_time > NOW()"]
+        params = []
+        if flight_ids:
+            conditions.append("id_flight IN (" + ", ".join(["%s"] * len(flight_ids)) + ")")
+            params.extend(int(fid) for fid in flight_ids)
+        if route_id:
+            conditions.append("id_route = %s")
+            params.append(route_id)
+        if date_from:
+            conditions.append("departure_time >= %s")
+            params.append(date_from)
+        if date_to:
+            conditions.append("departure_time < DATE_ADD(%s, INTERVAL 1 DAY)")
+            params.append(date_to)
+        if plane_id:
+            conditions.append("id_plane = %s")
+            params.append(plane_id)
+        if len(conditions) == 2:
+            return False, "Select flights or at least one filter."
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT id_flight, departure_time > NOW() + INTERVAL %s HOUR FROM flights WHERE "
+                           + " AND ".join(conditions) + " FOR UPDATE", [CANCEL_NOTICE_HOURS] + params)
+            rows = cursor.fetchall()
+            ids = [row[0] for row in rows if row[1]]
+            # Matching flights inside the notice period, and requested IDs that are not upcoming scheduled flights
+            skipped_ids = sorted(({row[0] for row in rows} | {int(fid) for fid in flight_ids or []}) - set(ids))
+            if not ids:
+                self.connection.rollback()
+                return True, {"flight_ids": [], "flights_cancelled": 0, "bookings_affected": 0, "skipped_ids": skipped_ids}
+
+            in_list = "(" + ", ".join(["%s"] * len(ids)) + ")"
+            cursor.execute("UPDATE flights SET flight_status = 'Cancelled' WHERE id_flight IN " + in_list, ids)
+            cursor.execute(
+                "UPDATE bookings SET status = 'Cancelled_System' WHERE status = 'Confirmed' "
+                "AND id_booking IN (SELECT id_booking FROM tickets WHERE id_flight IN " + in_list + ")", ids)
+            bookings_affected = cursor.rowcount
+            cursor.execute("DELETE FROM resource_positions WHERE id_flight IN " + in_list, ids)
+            self.connection.commit()
+            self._notify_change('flight_cancelled', ids)
+            return True, {"flight_ids": ids, "flights_cancelled": len(ids), "bookings_affected": bookings_affected,
+                          "skipped_ids": skipped_ids}
+        except Exception as e:
+            self.connection.rollback()
+            return False, str(e)
+        finally:
+            cursor.close()
+
+    @replica_read
     def get_routes_only(self):
         """Retrieving all existing routes to populate the dashboard form"""
         cursor = self.connection.cursor(dictionary=True)
@@ -518,18 +1215,10 @@ class Database:
 
             total_minutes = (h * 60) + m
             is_long_haul = total_minutes > 360
+            positions = self.get_positions_snapshot(dep_time)
 
             query_planes = """
                 SELECT p.id_plane, p.size,
-                COALESCE(
-                    (SELECT r_prev.destination_code 
-                     FROM flights f_prev 
-                     JOIN routes r_prev ON f_prev.id_route = r_prev.id_route
-                     WHERE f_prev.id_plane = p.id_plane 
-                       AND f_prev.departure_time < %s 
-                       AND f_prev.flight_status != 'Cancelled'
-                     ORDER BY f_prev.departure_time DESC LIMIT 1
-                    ), 'TLV') as current_location,
                 (SELECT COUNT(*) FROM flights f
                  JOIN routes r ON f.id_route = r.id_route
                  WHERE f.id_plane = p.id_plane
@@ -539,8 +1228,10 @@ class Database:
                 ) as busy_count
                 FROM planes p
             """
-            cursor.execute(query_planes, (dep_time, arr_time, dep_time))
+            cursor.execute(with_budget(query_planes, 'availability'), (arr_time, dep_time))
             planes_raw = cursor.fetchall()
+            for p in planes_raw:
+                p['current_location'] = positions.get(('plane', str(p['id_plane'])), DEFAULT_LOCATION)
 
             processed_planes = []
             for p in planes_raw:
@@ -565,16 +1256,6 @@ class Database:
 
             query_pilots = """
                 SELECT w.id_worker, w.first_name, w.last_name, w.long_flights,
-                COALESCE(
-                    (SELECT r_prev.destination_code 
-                     FROM flights f_prev 
-                     JOIN routes r_prev ON f_prev.id_route = r_prev.id_route
-                     JOIN pilots_in_flights pif ON f_prev.id_flight = pif.id_flight
-                     WHERE pif.id_worker = w.id_worker
-                       AND f_prev.departure_time < %s 
-                       AND f_prev.flight_status != 'Cancelled'
-                     ORDER BY f_prev.departure_time DESC LIMIT 1
-                    ), 'TLV') as current_location,
                 (SELECT COUNT(*) FROM pilots_in_flights pf
                  JOIN flights f ON pf.id_flight = f.id_flight
                  JOIN routes r ON f.id_route = r.id_route
@@ -585,8 +1266,10 @@ class Database:
                 ) as busy_count
                 FROM pilots w
             """
-            cursor.execute(query_pilots, (dep_time, arr_time, dep_time))
+            cursor.execute(with_budget(query_pilots, 'availability'), (arr_time, dep_time))
             pilots_raw = cursor.fetchall()
+            for w in pilots_raw:
+                w['current_location'] = positions.get(('pilot', str(w['id_worker'])), DEFAULT_LOCATION)
 
             processed_pilots = []
             for w in pilots_raw:
@@ -610,16 +1293,6 @@ class Database:
 
             query_attendants = """
                 SELECT w.id_worker, w.first_name, w.last_name, w.long_flights,
-                COALESCE(
-                    (SELECT r_prev.destination_code 
-                     FROM flights f_prev 
-                     JOIN routes r_prev ON f_prev.id_route = r_prev.id_route
-                     JOIN flight_attendants_in_flights af ON f_prev.id_flight = af.id_flight
-                     WHERE af.id_worker = w.id_worker
-                       AND f_prev.departure_time < %s 
-                       AND f_prev.flight_status != 'Cancelled'
-                     ORDER BY f_prev.departure_time DESC LIMIT 1
-                    ), 'TLV') as current_location,
                 (SELECT COUNT(*) FROM flight_attendants_in_flights af
                  JOIN flights f ON af.id_flight = f.id_flight
                  JOIN routes r ON f.id_route = r.id_route
@@ -630,8 +1303,10 @@ class Database:
                 ) as busy_count
                 FROM flight_attendants w
             """
-            cursor.execute(query_attendants, (dep_time, arr_time, dep_time))
+            cursor.execute(with_budget(query_attendants, 'availability'), (arr_time, dep_time))
             attendants_raw = cursor.fetchall()
+            for w in attendants_raw:
+                w['current_location'] = positions.get(('attendant', str(w['id_worker'])), DEFAULT_LOCATION)
 
             processed_attendants = []
             for w in attendants_raw:
@@ -658,12 +1333,80 @@ class Database:
                 "is_long_haul": is_long_haul, "arrival_time": arr_time.strftime('%Y-%m-%d %H:%M')
             }
 
+        except mysql.connector.Error:
+            raise
         except Exception as e:
             print(f"Error checking availability: {e}")
             return None
         finally:
             cursor.close()
 
+    def get_resource_position(self, resource_type, resource_id, at_time):
+        """Looking up where a plane, pilot or attendant is at a given time from the position ledger (an indexed point lookup)"""
+        query = """
+            SELECT location FROM resource_positions
+            WHERE resource_type = %s AND resource_id = %s AND valid_from < %s
+            ORDER BY valid_from DESC LIMIT 1
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, (resource_type, str(resource_id), at_time))
+            row = cursor.fetchone()
+            return row[0] if row else DEFAULT_LOCATION
+        finally:
+            cursor.close()
+
+    def get_positions_snapshot(self, at_time, resource_type=None):
+        """Retrieving the location of every resource at a given time in one query, keyed by (resource_type, resource_id); resources without history are absent and default to TLV"""
+        type_filter = "AND resource_type = %s" if resource_type else ""
+        query = f"""
+            SELECT rp.resource_type, rp.resource_id, rp.location
+            FROM resource_positions rp
+            JOIN (SELECT resource_type, resource_id, MAX(valid_from) AS valid_from
+                  FROM resource_positions
+                  WHERE valid_from < %s {type_filter}
+                  GROUP BY resource_type, resource_id) latest
+              ON latest.resource_type = rp.resource_type
+             AND latest.resource_id = rp.resource_id
+             AND latest.valid_from = rp.valid_from
+        """
+        params = (at_time, resource_type) if resource_type else (at_time,)
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            return {(r_type, r_id): location for r_type, r_id, location in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    def rebuild_position_ledger(self):
+        """Rebuilds the position ledger from all non-cancelled flights, live and archived, and their assigned plane and crew"""
+        source = """
+            SELECT %s, {id_col}, f.departure_time, r.destination_code, f.id_flight
+            FROM """ + self._tier('flights', True) + """ f
+            JOIN routes r ON f.id_route = r.id_route
+            {join}
+            WHERE f.flight_status != 'Cancelled'
+        """
+        sources = [
+            ('plane', source.format(id_col="f.id_plane", join="")),
+            ('pilot', source.format(id_col="pif.id_worker", join=f"JOIN {self._tier('pilots_in_flights', True)} pif ON pif.id_flight = f.id_flight")),
+            ('attendant', source.format(id_col="af.id_worker", join=f"JOIN {self._tier('flight_attendants_in_flights', True)} af ON af.id_flight = f.id_flight")),
+        ]
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("DELETE FROM resource_positions")
+            for res_type, select in sources:
+                cursor.execute("INSERT IGNORE INTO resource_positions (resource_type, resource_id, valid_from, location, id_flight) "
+                               + select, (res_type,))
+            self.connection.commit()
+            return True
+        except Exception as e:
+            self.connection.rollback()
+            print(f"Error rebuilding position ledger: {e}")
+            return False
+        finally:
+            cursor.close()
+
     def add_new_flight(self, route_id, plane_id, departure_time, pilots_ids, attendants_ids, manager_id, price_eco, price_bus):
         """Creating a new flight, assigning the crew, and setting prices"""
         cursor = self.connection.cursor()
@@ -692,7 +1435,19 @@ class Database:
                     "INSERT INTO flight_pricing (id_flight, price, class_type) VALUES (%s, %s, 'Business')",
                     (new_flight_id, price_bus))
 
+            query_position = """
+                INSERT INTO resource_positions (resource_type, resource_id, valid_from, location, id_flight)
+                SELECT %s, %s, f.departure_time, r.destination_code, f.id_flight
+                FROM flights f JOIN routes r ON f.id_route = r.id_route
+                WHERE f.id_flight = %s
+            """
+            positions = [('plane', plane_id)] + [('pilot', pid) for pid in pilots_ids] + \
+                        [('attendant', aid) for aid in attendants_ids]
+            for res_type, res_id in positions:
+                cursor.execute(query_position, (res_type, str(res_id), new_flight_id))
+
             self.connection.commit()
+            self._notify_change('flight_added', [new_flight_id])
             return True, "Flight created successfully"
         except Exception as e:
             self.connection.rollback()
@@ -752,6 +1507,7 @@ class Database:
                 ))
 
             self.connection.commit()
+            self._notify_change('resource_added', [form.get('id_plane') if res_type == 'aircraft' else form.get('id_worker')])
             return True
         except Exception as e:
             print(f"Error adding resource: {e}")
@@ -789,6 +1545,7 @@ class Database:
                 ))
 
             self.connection.commit()
+            self._notify_change('resource_updated', [form.get('id_plane') if res_type == 'aircraft' else form.get('id_worker')])
             return True
         except Exception as e:
             print(f"Error updating resource: {e}")
@@ -831,7 +1588,361 @@ class Database:
         finally:
             cursor.close()
 
-# --- Section 5: Data & more ---
+    def get_resource_by_id(self, res_type, res_id):
+        """Retrieving a single pilot, attendant or aircraft by its primary key"""
+        table, id_col = RESOURCE_TABLES[res_type]
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            cursor.execute(f"SELECT * FROM {table} WHERE {id_col} = %s", (res_id,))
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+    def get_resources_page(self, res_type, offset, limit, long_flights=None, size=None):
+        """Retrieving one page of pilots, attendants or aircraft ordered by ID, optionally filtered by long-haul qualification or plane size, with the total match count"""
+        table, id_col = RESOURCE_TABLES[res_type]
+        conditions, params = [], []
+        if long_flights is not None and res_type != 'aircraft':
+            conditions.append("long_flights = %s")
+            params.append(1 if long_flights else 0)
+        if size and res_type == 'aircraft':
+            conditions.append("size = %s")
+            params.append(size)
+        where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            cursor.execute(f"SELECT COUNT(*) AS total FROM {table}{where}", params)
+            total = cursor.fetchone()['total']
+            cursor.execute(f"SELECT * FROM {table}{where} ORDER BY {id_col} LIMIT %s OFFSET %s",
+                           params + [int(limit), int(offset)])
+            return cursor.fetchall(), total
+        finally:
+            cursor.close()
+
+    def iter_flight_manifest(self, flight_id, include_archive=False):
+        """Streaming the passenger manifest of a flight, one row per ticket, ordered by cabin and seat"""
+        query = f"""
+            SELECT t.id_flight, t.class_type, t.`row_number`, t.seat_letter,
+                   t.passenger_name, t.passenger_passport,
+                   b.id_booking, b.status AS booking_status, b.customers_email
+            FROM {self._tier('tickets', include_archive)} t
+            JOIN {self._tier('bookings', include_archive)} b ON b.id_booking = t.id_booking
+            WHERE t.id_flight = %s
+            ORDER BY t.class_type, t.`row_number`, t.seat_letter
+        """
+        return self.iter_query(query, (flight_id,))
+
+    @staticmethod
+    def _date_range(column, date_from, date_to):
+        """SQL conditions and parameters keeping a datetime column within whole days from date_from through date_to; a missing bound is left open"""
+        conditions, params = [], []
+        if date_from:
+            conditions.append(f"{column} >= %s")
+            params.append(date_from)
+        if date_to:
+            conditions.append(f"{column} < DATE_ADD(%s, INTERVAL 1 DAY)")
+            params.append(date_to)
+        return conditions, params
+
+    def iter_bookings_by_date(self, date_from=None, date_to=None, include_archive=False):
+        """Streaming all bookings made within a date range together with their flight, route and ticket count"""
+        conditions, params = self._date_range('b.booking_date', date_from, date_to)
+        # ANY_VALUE: with the archive the tiers are keyless derived tables, so ONLY_FULL_GROUP_BY cannot see that
+        # these columns depend on the grouped IDs
+        query = f"""
+            SELECT b.id_booking, ANY_VALUE(b.booking_date) AS booking_date, ANY_VALUE(b.status) AS booking_status,
+                   ANY_VALUE(b.total_price) AS total_price, ANY_VALUE(b.customers_email) AS customers_email,
+                   ANY_VALUE(b.registered_email) AS registered_email,
+                   f.id_flight, ANY_VALUE(f.departure_time) AS departure_time,
+                   ANY_VALUE(r.origin_code) AS origin_code, ANY_VALUE(r.destination_code) AS destination_code,
+                   COUNT(*) AS tickets_count
+            FROM {self._tier('bookings', include_archive)} b
+            JOIN {self._tier('tickets', include_archive)} t ON t.id_booking = b.id_booking
+            JOIN {self._tier('flights', include_archive)} f ON f.id_flight = t.id_flight
+            JOIN routes r ON r.id_route = f.id_route
+            {"WHERE " + " AND ".join(conditions) if conditions else ""}
+            GROUP BY b.id_booking, f.id_flight
+            ORDER BY b.id_booking
+        """
+        return self.iter_query(query, params)
+
+    def iter_revenue_by_route(self, date_from=None, date_to=None, include_archive=False):
+        """Streaming booking revenue per route for flights departing within a date range; system-cancelled (refunded) bookings are excluded"""
+        conditions, params = self._date_range('f.departure_time', date_from, date_to)
+        query = f"""
+            SELECT r.id_route, r.origin_code, r.destination_code,
+                   COUNT(DISTINCT f.id_flight) AS flights_count,
+                   COUNT(DISTINCT b.id_booking) AS bookings_count,
+                   SUM(b.total_price) AS revenue
+            FROM (SELECT DISTINCT id_booking, id_flight FROM {self._tier('tickets', include_archive)} t) bt
+            JOIN {self._tier('bookings', include_archive)} b ON b.id_booking = bt.id_booking
+            JOIN {self._tier('flights', include_archive)} f ON f.id_flight = bt.id_flight
+            JOIN routes r ON r.id_route = f.id_route
+            WHERE {" AND ".join(["b.status != 'Cancelled_System'"] + conditions)}
+            GROUP BY r.id_route, r.origin_code, r.destination_code
+            ORDER BY revenue DESC
+        """
+        return self.iter_query(query, params)
+
+    def archive_departed_flights(self, older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+        """Moves flights that departed more than older_than_days ago and have no confirmed bookings, with their pricing, crew, bookings and tickets, into the archive tables; each batch is copied and deleted in one transaction. Returns the number of flights archived"""
+        select_query = """
+            SELECT f.id_flight FROM flights f
+            WHERE f.departure_time < NOW() - INTERVAL %s DAY
+              AND NOT EXISTS (SELECT 1 FROM tickets t JOIN bookings b ON b.id_booking = t.id_booking
+                              WHERE t.id_flight = f.id_flight AND b.status = 'Confirmed')
+            ORDER BY f.id_flight
+            LIMIT %s
+            FOR UPDATE
+        """
+        total = 0
+        cursor = self.connection.cursor()
+        try:
+            while True:
+                cursor.execute(select_query, (int(older_than_days), batch_size))
+                flight_ids = [row[0] for row in cursor.fetchall()]
+                if not flight_ids:
+                    self.connection.rollback()
+                    break
+                cursor.execute("SELECT DISTINCT id_booking FROM tickets WHERE id_flight IN " + self._in_clause(flight_ids),
+                               flight_ids)
+                booking_ids = [row[0] for row in cursor.fetchall()]
+                keys = {'id_flight': flight_ids, 'id_booking': booking_ids}
+
+                for table, key in ARCHIVE_TABLES:
+                    if keys[key]:
+                        cursor.execute(f"INSERT INTO {table}_archive SELECT * FROM {table} WHERE {key} IN "
+                                       + self._in_clause(keys[key]), keys[key])
+                for table, key in reversed(ARCHIVE_TABLES):
+                    if keys[key]:
+                        cursor.execute(f"DELETE FROM {table} WHERE {key} IN " + self._in_clause(keys[key]), keys[key])
+                self.connection.commit()
+                total += len(flight_ids)
+                self._notify_change('flight_archived', flight_ids)
+                if len(flight_ids) < batch_size:
+                    break
+        except Exception as e:
+            self.connection.rollback()
+            print(f"Error archiving flights: {e}")
+        finally:
+            cursor.close()
+        return total
+
+# --- Section 5: Reporting Snapshots ---
+
+    def _fetch_tuples(self, query, params=()):
+        """Runs a read query with a plain tuple cursor, for loading columnar snapshots without per-row dictionaries"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _in_clause(self, ids):
+        return "(" + ", ".join(["%s"] * len(ids)) + ")"
+
+    def get_report_flights(self, since_id=0, until_id=None, flight_ids=None):
+        """Snapshot rows (id, route, plane, departure, duration in minutes, is_cancelled) for live and archived flights in an ID window or a given ID list"""
+        query = f"""
+            SELECT f.id_flight, f.id_route, f.id_plane, f.departure_time,
+                   TIME_TO_SEC(r.duration) DIV 60, f.flight_status = 'Cancelled'
+            FROM {self._tier('flights', True)} f JOIN routes r ON f.id_route = r.id_route
+        """
+        if flight_ids:
+            return self._fetch_tuples(query + " WHERE f.id_flight IN " + self._in_clause(flight_ids), list(flight_ids))
+        if until_id is None:
+            return self._fetch_tuples(query + " WHERE f.id_flight > %s ORDER BY f.id_flight", (since_id,))
+        return self._fetch_tuples(query + " WHERE f.id_flight > %s AND f.id_flight <= %s ORDER BY f.id_flight",
+                                  (since_id, until_id))
+
+    def get_report_clock(self):
+        """The database's current time, used as the snapshot's change watermark"""
+        return self._fetch_tuples("SELECT NOW()")[0][0]
+
+    def get_report_flight_states(self, changed_since):
+        """Snapshot rows (id, is_cancelled) for live and archived flights modified since a time, for re-reading the mutable flight column"""
+        query = "SELECT id_flight, flight_status = 'Cancelled' FROM {} WHERE updated_at >= %s"
+        return self._fetch_tuples(query.format('flights') + " UNION ALL " + query.format('flights_archive'),
+                                  (changed_since, changed_since))
+
+    def get_report_booking_states(self, changed_since):
+        """Snapshot rows (id, status, total price) for live and archived bookings modified since a time, for re-reading the mutable booking columns"""
+        query = "SELECT id_booking, status, total_price FROM {} WHERE updated_at >= %s"
+        return self._fetch_tuples(query.format('bookings') + " UNION ALL " + query.format('bookings_archive'),
+                                  (changed_since, changed_since))
+
+    def get_report_routes(self):
+        """Snapshot rows (id, origin code, destination code) for every route"""
+        return self._fetch_tuples("SELECT id_route, origin_code, destination_code FROM routes")
+
+    def get_report_capacity(self):
+        """Snapshot rows (plane, class, seat count) from the cabin layouts"""
+        return self._fetch_tuples("SELECT id_plane, class_type, num_rows * num_cols FROM classes")
+
+    def get_report_bookings(self, since_id=0, booking_ids=None, flight_ids=None):
+        """Snapshot rows (id, booking date, status, total price) for new bookings, given bookings, or the bookings of given flights"""
+        query = f"SELECT id_booking, booking_date, status, total_price FROM {self._tier('bookings', True)} b"
+        if booking_ids:
+            return self._fetch_tuples(query + " WHERE id_booking IN " + self._in_clause(booking_ids), list(booking_ids))
+        if flight_ids:
+            return self._fetch_tuples(query + f" WHERE id_booking IN (SELECT id_booking FROM {self._tier('tickets', True)} t WHERE id_flight IN "
+                                      + self._in_clause(flight_ids) + ")", list(flight_ids))
+        return self._fetch_tuples(query + " WHERE id_booking > %s ORDER BY id_booking", (since_id,))
+
+    def get_report_tickets(self, since_booking_id, until_booking_id):
+        """Snapshot rows (booking, flight, class) for the tickets of bookings in an ID window"""
+        return self._fetch_tuples(
+            f"SELECT id_booking, id_flight, class_type FROM {self._tier('tickets', True)} t WHERE id_booking > %s AND id_booking <= %s",
+            (since_booking_id, until_booking_id))
+
+    def get_report_crew(self, since_flight_id, until_flight_id):
+        """Snapshot rows (role, worker, flight) for crew assignments of flights in an ID window"""
+        return self._fetch_tuples(f"""
+            SELECT 'pilot', id_worker, id_flight FROM {self._tier('pilots_in_flights', True)} p WHERE id_flight > %s AND id_flight <= %s
+            UNION ALL
+            SELECT 'attendant', id_worker, id_flight FROM {self._tier('flight_attendants_in_flights', True)} a WHERE id_flight > %s AND id_flight <= %s
+        """, (since_flight_id, until_flight_id, since_flight_id, until_flight_id))
+
+# --- Section 6: Background Jobs ---
+
+    def create_job(self, job_type, payload, max_attempts=3, parent_job=None, created_by=None):
+        """Persisting a new queued job and returning its ID"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO jobs (job_type, payload, max_attempts, parent_job, created_by, created_at, updated_at, run_after)
+                VALUES (%s, %s, %s, %s, %s, NOW(), NOW(), NOW())
+            """, (job_type, payload, max_attempts, parent_job, created_by))
+            self.connection.commit()
+            return cursor.lastrowid
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def claim_next_job(self, owner):
+        """Atomically picking the oldest due queued job, marking it 'Running' under the given owner and counting the attempt; SKIP LOCKED lets several workers poll concurrently"""
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT * FROM jobs
+                WHERE status = 'Queued' AND run_after <= NOW()
+                ORDER BY id_job LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            """)
+            job = cursor.fetchone()
+            if not job:
+                self.connection.commit()
+                return None
+            cursor.execute("UPDATE jobs SET status = 'Running', attempts = attempts + 1, claimed_by = %s, "
+                           "heartbeat_at = NOW(), updated_at = NOW() WHERE id_job = %s", (owner, job['id_job']))
+            self.connection.commit()
+            job['attempts'] += 1
+            return job
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def update_job(self, job_id, status=None, progress=None, result=None, error=None, retry_in_seconds=None, owner=None):
+        """Updating a job's status, progress, result or error; retry_in_seconds puts it back in the queue after a delay, and an owner only updates a job it still holds"""
+        sets, params = ["updated_at = NOW()"], []
+        if status is not None:
+            sets.append("status = %s")
+            params.append(status)
+        if progress is not None:
+            sets.append("progress = %s")
+            params.append(int(progress))
+        if result is not None:
+            sets.append("result = %s")
+            params.append(result)
+        if error is not None:
+            sets.append("error = %s")
+            params.append(error)
+        if retry_in_seconds is not None:
+            sets.append("run_after = DATE_ADD(NOW(), INTERVAL %s SECOND)")
+            params.append(int(retry_in_seconds))
+        cursor = self.connection.cursor()
+        try:
+            where, where_params = "id_job = %s", [job_id]
+            if owner is not None:
+                where += " AND claimed_by = %s"
+                where_params.append(owner)
+            cursor.execute("UPDATE jobs SET " + ", ".join(sets) + " WHERE " + where, params + where_params)
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def get_job(self, job_id):
+        """Retrieving a job's current state for progress polling"""
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT id_job, job_type, status, progress, attempts, max_attempts, result, error,
+                       parent_job, created_at, updated_at
+                FROM jobs WHERE id_job = %s
+            """, (job_id,))
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+    def heartbeat_jobs(self, owner, job_ids):
+        """Marking the given running jobs as still alive under their owner"""
+        if not job_ids:
+            return 0
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("UPDATE jobs SET heartbeat_at = NOW() WHERE status = 'Running' AND claimed_by = %s "
+                           "AND id_job IN " + self._in_clause(job_ids), [owner] + list(job_ids))
+            self.connection.commit()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    def requeue_stale_jobs(self, stale_seconds):
+        """Returning jobs whose owner stopped heartbeating (a crashed or stopped process) to the queue"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                UPDATE jobs SET status = 'Queued', claimed_by = NULL, updated_at = NOW()
+                WHERE status = 'Running' AND COALESCE(heartbeat_at, updated_at) < DATE_SUB(NOW(), INTERVAL %s SECOND)
+            """, (stale_seconds,))
+            self.connection.commit()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    def add_cancellation_notifications(self, flight_ids, job_id=None):
+        """Writing one outbox notification per booking affected by the cancelled flights (idempotent per booking)"""
+        if not flight_ids:
+            return 0
+        in_list = "(" + ", ".join(["%s"] * len(flight_ids)) + ")"
+        query = """
+            INSERT IGNORE INTO notification_outbox (id_booking, email, kind, message, id_job, created_at)
+            SELECT DISTINCT b.id_booking, b.customers_email, 'flight_cancelled',
+                   CONCAT('Your flight #', t.id_flight, ' departing ', DATE_FORMAT(f.departure_time, '%%d %%b %%Y %%H:%%i'),
+                          ' was cancelled. Booking #', b.id_booking, ' will be refunded in full.'),
+                   %s, NOW()
+            FROM bookings b
+            JOIN tickets t ON b.id_booking = t.id_booking
+            JOIN flights f ON t.id_flight = f.id_flight
+            WHERE b.status = 'Cancelled_System' AND t.id_flight IN """ + in_list
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, [job_id] + [int(fid) for fid in flight_ids])
+            self.connection.commit()
+            return cursor.rowcount
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+# --- Section 7: Data & more ---
 
     def get_full_user_details(self, email):
         """Retrieving details for form auto-fill (for registered users)"""
@@ -861,11 +1972,14 @@ class Database:
 
 
     def get_last_booking_id(self):
-        """Helper function to retrieve the highest ID in a table"""
+        """Helper function to retrieve the highest booking ID, including bookings already moved to the archive"""
         cursor = self.connection.cursor()
         try:
-            cursor.execute("SELECT MAX(id_booking) FROM bookings")
+            cursor.execute("SELECT NULLIF(GREATEST(COALESCE((SELECT MAX(id_booking) FROM bookings), 0), "
+                           "COALESCE((SELECT MAX(id_booking) FROM bookings_archive), 0)), 0)")
             row = cursor.fetchone()
             return row[0]
         finally:
             cursor.close()
+
+after_fork(Database._after_fork_in_child)
@@ -0,0 +1,39 @@
+import csv
+import io
+import json
+
+FLUSH_ROWS = 500
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson'
+}
+
+#Encodes rows as CSV (header first) or JSON lines, flushing every FLUSH_ROWS rows so only one batch is held in memory
+def stream_rows(rows, fmt='csv'):
+    if fmt == 'jsonl':
+        buffer = []
+        for row in rows:
+            buffer.append(json.dumps(row, default=str))
+            if len(buffer) >= FLUSH_ROWS:
+                yield "\n".join(buffer) + "\n"
+                buffer = []
+        if buffer:
+            yield "\n".join(buffer) + "\n"
+        return
+
+    out = io.StringIO()
+    writer = None
+    count = 0
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(out, fieldnames=list(row.keys()))
+            writer.writeheader()
+        writer.writerow(row)
+        count += 1
+        if count % FLUSH_ROWS == 0:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate(0)
+    if out.getvalue():
+        yield out.getvalue()
@@ -0,0 +1,130 @@
+import threading
+import time
+import mysql.connector
+from database import Database, after_fork
+
+db = Database()
+
+MAX_MATRIX_AGE_SECONDS = 300
+
+class FareMatrix:
+    """In-memory origin × destination × day table of the lowest fares, kept current through flight change events and rebuilt from the database once older than max_age seconds, which also drops departed flights and picks up changes made by other processes"""
+    def __init__(self, max_age=MAX_MATRIX_AGE_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._cells = {}        # origin -> destination -> day -> {flight_id: price}
+        self._flights = {}      # flight_id -> (origin, destination, day)
+        self._countries = {}    # destination city -> country
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._changed_during_reload = None
+
+    def _is_fresh(self):
+        return self._loaded and time.monotonic() - self._loaded_at < self.max_age
+
+    def _ensure_loaded(self):
+        if self._is_fresh():
+            return
+        # One thread rebuilds; once a matrix exists the others keep answering from it meanwhile
+        if not self._reload_lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            if self._is_fresh():
+                return
+            try:
+                self.reload()
+            except mysql.connector.Error as e:
+                if not self._loaded:
+                    raise
+                print(f"Fare matrix reload failed, keeping the current one: {e}")
+                self._loaded_at = time.monotonic()
+        finally:
+            self._reload_lock.release()
+
+    def reload(self):
+        """Builds a fresh matrix of upcoming flights aside and swaps it in, then re-reads flights changed while it was loading"""
+        with self._lock:
+            self._changed_during_reload = changed = set()
+        try:
+            fresh = FareMatrix()
+            for row in db.get_fare_matrix_rows():
+                fresh._add_row(row)
+        except BaseException:
+            with self._lock:
+                self._changed_during_reload = None
+            raise
+        with self._lock:
+            self._cells, self._flights, self._countries = fresh._cells, fresh._flights, fresh._countries
+            self._changed_during_reload = None
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+        if changed:
+            self.refresh_flights(changed)
+
+    def _add_row(self, row):
+        fid = row['id_flight']
+        origin, dest = row['origin_city'], row['destination_city']
+        day = row['departure_time'].date()
+        self._cells.setdefault(origin, {}).setdefault(dest, {}).setdefault(day, {})[fid] = float(row['min_price'])
+        self._flights[fid] = (origin, dest, day)
+        self._countries[dest] = row['destination_country']
+
+    def _remove_flight(self, fid):
+        key = self._flights.pop(fid, None)
+        if not key:
+            return
+        origin, dest, day = key
+        by_day = self._cells[origin][dest]
+        by_day[day].pop(fid, None)
+        if not by_day[day]:
+            del by_day[day]
+        if not by_day:
+            del self._cells[origin][dest]
+
+    def refresh_flights(self, flight_ids):
+        """Re-reads only the given flights and replaces their cells, so cancellations and price changes never trigger a full reload"""
+        flight_ids = [int(fid) for fid in flight_ids]
+        rows = db.get_fare_matrix_rows(flight_ids)
+        with self._lock:
+            for fid in flight_ids:
+                self._remove_flight(fid)
+            for row in rows:
+                self._add_row(row)
+
+    def on_change(self, event, flight_ids):
+        if not event.startswith('flight_'):
+            return
+        with self._lock:
+            if self._changed_during_reload is not None:
+                self._changed_during_reload.update(int(fid) for fid in flight_ids)
+            loaded = self._loaded
+        if loaded:
+            self.refresh_flights(flight_ids)
+
+    def cheapest_by_destination(self, origin, start_date, end_date):
+        """Returns the cheapest fare (and its day) to every destination reachable from origin within the inclusive date window, cheapest first"""
+        self._ensure_loaded()
+        results = []
+        with self._lock:
+            for dest, by_day in self._cells.get(origin, {}).items():
+                best = None
+                for day, prices in by_day.items():
+                    if start_date <= day <= end_date:
+                        price = min(prices.values())
+                        if best is None or price < best[1]:
+                            best = (day, price)
+                if best:
+                    results.append({
+                        'destination': dest,
+                        'country': self._countries.get(dest),
+                        'date': best[0].strftime('%Y-%m-%d'),
+                        'min_price': best[1]
+                    })
+        results.sort(key=lambda r: r['min_price'])
+        return results
+
+fare_matrix = FareMatrix()
+db.add_change_listener(fare_matrix.on_change)
+# A forked worker starts with an empty matrix and fresh locks and loads its own on first use
+after_fork(fare_matrix.__init__)
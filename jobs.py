@@ -0,0 +1,172 @@
+import json
+import os
+import socket
+import threading
+import traceback
+from database import Database, after_fork
+from registry import resource_registry
+
+db = Database()
+
+WORKER_COUNT = 2
+POLL_SECONDS = 1.0
+RETRY_BASE_SECONDS = 5
+# Running jobs are heartbeated by their process; one whose heartbeat is older than STALE_SECONDS lost its owner and is requeued
+HEARTBEAT_SECONDS = 15
+STALE_SECONDS = 120
+
+JOB_HANDLERS = {}
+
+def job_handler(job_type):
+    """Registers the decorated function as the handler for a job type; handlers receive (ctx, payload) and return a JSON-serializable result"""
+    def register(fn):
+        JOB_HANDLERS[job_type] = fn
+        return fn
+    return register
+
+class JobContext:
+    """Handed to a running handler so it can report progress and queue follow-up work"""
+    def __init__(self, queue, job):
+        self.queue = queue
+        self.job = job
+
+    def progress(self, percent):
+        db.update_job(self.job['id_job'], progress=percent, owner=self.queue.owner)
+
+    def enqueue(self, job_type, payload, max_attempts=3):
+        return self.queue.submit(job_type, payload, max_attempts=max_attempts,
+                                 parent_job=self.job['id_job'], created_by=self.job['created_by'])
+
+class JobQueue:
+    """In-process worker pool over the persistent jobs table: submit() returns a job ID at once, workers claim due jobs, retry failures with backoff and record results; a monitor thread heartbeats this process's running jobs and requeues those whose owner died"""
+    def __init__(self, workers=WORKER_COUNT, poll_seconds=POLL_SECONDS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            targets = [(self._monitor, "flytau-job-monitor")]
+            targets += [(self._run, f"flytau-job-worker-{i}") for i in range(self.workers)]
+            for target, name in targets:
+                t = threading.Thread(target=target, name=name, daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for t in threads:
+            t.join(timeout=5)
+
+    def submit(self, job_type, payload, max_attempts=3, parent_job=None, created_by=None):
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = db.create_job(job_type, json.dumps(payload), max_attempts, parent_job,
+                               str(created_by) if created_by is not None else None)
+        self.start()
+        self._wakeup.set()
+        return job_id
+
+    def status(self, job_id):
+        job = db.get_job(job_id)
+        if job and job.get('result'):
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = db.claim_next_job(self.owner)
+                if job:
+                    self._execute(job)
+                    continue
+            except Exception as e:
+                print(f"Job worker error: {e}")
+            finally:
+                db.release_connection()
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+    def _monitor(self):
+        while not self._stop.is_set():
+            try:
+                with self._lock:
+                    running = list(self._running)
+                db.heartbeat_jobs(self.owner, running)
+                if db.requeue_stale_jobs(STALE_SECONDS):
+                    self._wakeup.set()
+            except Exception as e:
+                print(f"Job monitor error: {e}")
+            finally:
+                db.release_connection()
+            self._stop.wait(HEARTBEAT_SECONDS)
+
+    def _execute(self, job):
+        handler = JOB_HANDLERS.get(job['job_type'])
+        with self._lock:
+            self._running.add(job['id_job'])
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job type {job['job_type']}")
+            result = handler(JobContext(self, job), json.loads(job['payload']))
+            db.update_job(job['id_job'], status='Succeeded', progress=100, result=json.dumps(result, default=str),
+                          owner=self.owner)
+        except Exception as e:
+            print(f"Job #{job['id_job']} ({job['job_type']}) attempt {job['attempts']} failed: {e}")
+            if job['attempts'] < job['max_attempts']:
+                db.update_job(job['id_job'], status='Queued', error=str(e),
+                              retry_in_seconds=RETRY_BASE_SECONDS * 2 ** (job['attempts'] - 1), owner=self.owner)
+            else:
+                db.update_job(job['id_job'], status='Failed', error=traceback.format_exc(limit=5), owner=self.owner)
+        finally:
+            with self._lock:
+                self._running.discard(job['id_job'])
+
+# --- Handlers ---
+
+@job_handler('cancel_flight')
+def _cancel_flight(ctx, payload):
+    success, message = db.cancel_flight_full_logic(payload['flight_id'])
+    if not success:
+        raise RuntimeError(message)
+    ctx.progress(80)
+    notify_job = ctx.enqueue('notify_cancellation', {'flight_ids': [payload['flight_id']]})
+    return {'message': message, 'notify_job': notify_job}
+
+@job_handler('bulk_cancel')
+def _bulk_cancel(ctx, payload):
+    success, result = db.cancel_flights_bulk(payload.get('flight_ids'), payload.get('route_id'),
+                                             payload.get('date_from'), payload.get('date_to'),
+                                             payload.get('plane_id'))
+    if not success:
+        raise RuntimeError(result)
+    ctx.progress(80)
+    if result['flight_ids']:
+        result['notify_job'] = ctx.enqueue('notify_cancellation', {'flight_ids': result['flight_ids']})
+    return result
+
+@job_handler('add_resource')
+def _add_resource(ctx, payload):
+    if not db.add_resource(payload['resource_type'], payload['form']):
+        raise RuntimeError(f"Could not add {payload['resource_type']} (check ID or duplicates)")
+    resource_registry.invalidate()
+    return {'resource_type': payload['resource_type']}
+
+@job_handler('notify_cancellation')
+def _notify_cancellation(ctx, payload):
+    return {'notifications': db.add_cancellation_notifications(payload['flight_ids'], ctx.job['id_job'])}
+
+job_queue = JobQueue()
+# Worker threads do not survive a fork: a forked process starts with no workers and starts its own with its first request
+after_fork(job_queue.__init__)
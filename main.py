@@ -1,51 +1,82 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
-from models import Customer, Manager, Flight, Booking
-from database import Database
+import os
+import time
+import functools
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context
+from models import Customer, Manager, Flight, Booking, empty_search_page
+from database import Database, CANCEL_NOTICE_HOURS
 from datetime import datetime, timedelta
+from autocomplete import destination_index
+from exports import stream_rows, EXPORT_MIMETYPES
+from analytics import analytics, REPORTS
+from scheduler import scheduler
+from jobs import job_queue
 from utils import get_plane_object, map_occupied_seats, validate_seat_selection, _format_price, prepare_flights_for_view
 
-app = Flask(__name__)
-app.secret_key = 'flytau_secret_key'
 db = Database()
 
+# (rule, options, view) of every route below, registered on each application create_app() builds
+ROUTES = []
+
+"""Collects a view function and its URL rule for create_app(); endpoints keep the function names, so url_for() is unchanged"""
+def route(rule, **options):
+    def decorator(view):
+        ROUTES.append((rule, options, view))
+        return view
+    return decorator
+
+"""Starts this process's maintenance scheduler and job workers with its first request; later calls are no-ops"""
+def start_background_workers():
+    scheduler.start()
+    job_queue.start()
+
+"""Returns the request thread's pooled database connection once the request is finished"""
+def release_db_connection(exc=None):
+    db.release_connection()
+
+"""Sends every database read of the route to the primary instead of a replica"""
+def primary_reads(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with db.primary_only():
+            return view(*args, **kwargs)
+    return wrapper
+
+# How long a session's reads stay on the primary after it changed its own bookings, covering replica lag
+READ_YOUR_WRITES_SECONDS = 30
+
+"""Records that the session just changed its own data, so routes tagged with reads_own_writes read it back from the primary"""
+def mark_session_write():
+    session['primary_reads_until'] = time.time() + READ_YOUR_WRITES_SECONDS
+
+"""Sends the route's reads to the primary for a short while after the session wrote"""
+def reads_own_writes(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get('primary_reads_until', 0) > time.time():
+            with db.primary_only():
+                return view(*args, **kwargs)
+        return view(*args, **kwargs)
+    return wrapper
+
 # --- Section 1: Booking Lifecycle ---
 
 """Handles the flight search engine logic and displays results or suggested dates on the main landing page"""
-@app.route('/')
+@route('/')
 def home_page():
-    destinations = db.get_all_destinations()
-
     origin = request.args.get('origin')
     destination = request.args.get('destination')
     date = request.args.get('date')
     return_date = request.args.get('return_date')
     trip_type = request.args.get('trip_type')
 
-    outbound_flights = []
-    return_flights = []
-    suggested_dates = {"outbound": None, "return": None}
-    search_performed = False
-
-    if origin and destination and date:
-        search_performed = True
-        outbound_flights = Flight.search(date, origin, destination)
-
-        if not outbound_flights:
-            suggested_dates["outbound"] = db.get_nearest_flight_date(origin, destination, date)
-
-        if trip_type == 'round' and return_date:
-            return_flights = Flight.search(return_date, destination, origin)
-
-            if not return_flights:
-                # בודקים אחרי תאריך ההמראה (הלוך)
-                base_date = suggested_dates["outbound"] if suggested_dates["outbound"] else date
-                suggested_dates["return"] = db.get_nearest_flight_date(destination, origin, base_date, after=True)
+    search_performed = bool(origin and destination and date)
+    if search_performed:
+        results = Flight.search_page(origin, destination, date, return_date, trip_type)
+    else:
+        results = empty_search_page()
 
     return render_template('home_page.html',
-                           destinations=destinations,
-                           outbound_flights=outbound_flights,
-                           return_flights=return_flights,
-                           suggested_dates=suggested_dates,
+                           **results,
                            search_performed=search_performed,
                            origin=origin,
                            destination=destination,
@@ -53,8 +84,74 @@ def home_page():
                            return_date=return_date,
                            trip_type=trip_type)
 
+"""Suggests origin/destination airports whose city, country, airport name or code starts with the typed prefix"""
+@route("/api/autocomplete", methods=["GET"])
+def autocomplete_api():
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    matches = destination_index.lookup(request.args.get('q', ''), limit)
+    if matches is None:
+        return jsonify({"error": "Destinations are temporarily unavailable"}), 503
+    return jsonify(matches)
+
+"""Returns the lowest fare per day for a route as JSON, over ±days around the requested dates or for a whole month"""
+@route("/api/fare-calendar", methods=["GET"])
+def fare_calendar_api():
+    origin = request.args.get('origin')
+    destination = request.args.get('destination')
+    if not origin or not destination:
+        return jsonify({"error": "Missing origin or destination"}), 400
+
+    try:
+        days = min(max(int(request.args.get('days', 3)), 0), 31)
+        month = request.args.get('month')
+        date = request.args.get('date')
+        return_date = request.args.get('return_date')
+        result = Flight.fare_calendar_pair(origin, destination, date, return_date, days, month,
+                                           request.args.get('trip_type') == 'round')
+    except ValueError:
+        return jsonify({"error": "Invalid date, month or days value"}), 400
+    return jsonify(result)
+
+"""Returns the cheapest fare to every destination reachable from an origin within a date window, for customers without a fixed destination"""
+@route("/api/explore", methods=["GET"])
+def explore_api():
+    origin = request.args.get('origin')
+    date = request.args.get('date')
+    if not origin or not date:
+        return jsonify({"error": "Missing origin or date"}), 400
+
+    try:
+        days = min(max(int(request.args.get('days', 7)), 0), 90)
+        results = Flight.explore(origin, date, request.args.get('end_date'), days)
+    except ValueError:
+        return jsonify({"error": "Invalid date or days value"}), 400
+    return jsonify({"origin": origin, "destinations": results})
+
+"""Returns connecting itineraries (1-2 stops) for a route and date, ranked by total price and duration, with configurable connection limits"""
+@route("/api/connections", methods=["GET"])
+def connections_api():
+    origin = request.args.get('origin')
+    destination = request.args.get('destination')
+    date = request.args.get('date')
+    if not origin or not destination or not date:
+        return jsonify({"error": "Missing origin, destination or date"}), 400
+
+    try:
+        itineraries = Flight.search_connections(
+            date, origin, destination,
+            max_stops=min(max(int(request.args.get('max_stops', 2)), 1), 2),
+            min_connection_minutes=int(request.args.get('min_connection', 60)),
+            max_duration_hours=int(request.args.get('max_duration', 30)),
+            limit=min(int(request.args.get('limit', 20)), 100))
+    except ValueError:
+        return jsonify({"error": "Invalid date or search parameter"}), 400
+    return jsonify({"itineraries": itineraries})
+
 """Displays the interactive seat map with real-time availability and class-based pricing for the selected flight"""
-@app.route("/select-seats", methods=["GET"])
+@route("/select-seats", methods=["GET"])
 def select_seats_page():
     flight_id = request.args.get("flight_id")
     if not flight_id:
@@ -80,7 +177,8 @@ def select_seats_page():
                            col_letters="ABCDEFGHIJKLMNOPQRSTUVWXYZ")
 
 """Validates seat availability and initializes the temporary booking record in the session"""
-@app.route("/process-booking", methods=["POST"])
+@route("/process-booking", methods=["POST"])
+@primary_reads
 def process_booking():
     flight_id = request.form.get("flight_id")
     selected_seats = request.form.getlist("seats")
@@ -98,7 +196,7 @@ def process_booking():
     return redirect(url_for('passenger_details_page'))
 
 """Prepares the passenger details interface by calculating total costs and retrieving user profile data for automated form-filling"""
-@app.route("/passenger-details", methods=["GET"])
+@route("/passenger-details", methods=["GET"])
 def passenger_details_page():
     booking_data = session.get('current_booking')
     if not booking_data:
@@ -143,7 +241,8 @@ def passenger_details_page():
                            user=user_details)
 
 """Validates final seat availability and maps submitted passenger data from the form to the session-based booking object"""
-@app.route("/save-passengers", methods=["POST"])
+@route("/save-passengers", methods=["POST"])
+@primary_reads
 def save_passengers():
     current_booking = session.get('current_booking')
     if not current_booking:
@@ -203,7 +302,8 @@ def save_passengers():
     return redirect(url_for('booking_summery_page'))
 
 """Compiles and displays the final itinerary, passenger details, and total price for review before the transaction is finalized"""
-@app.route("/booking-summery", methods=["GET"])
+@route("/booking-summery", methods=["GET"])
+@primary_reads
 def booking_summery_page():
     booking_data = session.get('current_booking')
     if not booking_data:
@@ -255,7 +355,8 @@ def booking_summery_page():
                            total_price=formatted_total)
 
 """Finalizes the booking transaction by identifying the user type, committing the records to the database, and clearing the temporary session data"""
-@app.route("/booking-payment", methods=["GET","POST"])
+@route("/booking-payment", methods=["GET","POST"])
+@primary_reads
 def booking_payment():
 
     if request.method == "GET":
@@ -279,13 +380,14 @@ def booking_payment():
 
     if success:
         session.pop('current_booking', None)
+        mark_session_write()
         return redirect(url_for('booking_confirmation_page', booking_id=booking_id, email=user_email))
     else:
         flash("Error processing payment.", "error")
         return redirect(url_for('booking_summery_page'))
 
 """Displays the booking confirmation page with the unique booking ID and the user's email address"""
-@app.route("/booking-confirmation/<int:booking_id>")
+@route("/booking-confirmation/<int:booking_id>")
 def booking_confirmation_page(booking_id):
     email = request.args.get('email', '')
     return render_template("booking_confirmation.html", booking_id=booking_id, email=email)
@@ -293,7 +395,7 @@ def booking_confirmation_page(booking_id):
 # --- Section 2: User Authentication ---
 
 """Manages customer authentication by verifying credentials and initializing a secure user session to enable personalized access"""
-@app.route('/login', methods=['GET', 'POST'])
+@route('/login', methods=['GET', 'POST'])
 def register_login_page():
     email = None
     if request.method == 'POST':
@@ -310,7 +412,7 @@ def register_login_page():
     return render_template('register_login.html', email=email)
 
 """Manages new customer onboarding by processing registration data and immediately initializing a secure session upon successful account creation"""
-@app.route('/register', methods=['GET', 'POST'])
+@route('/register', methods=['GET', 'POST'])
 def create_account_page():
     if request.method == 'POST':
         f = request.form
@@ -336,7 +438,7 @@ def create_account_page():
     return render_template('create_account.html')
 
 """Authenticates managers and initializes administrative sessions with elevated access rights"""
-@app.route('/manager-login', methods=['GET', 'POST'])
+@route('/manager-login', methods=['GET', 'POST'])
 def manager_login_page():
     if request.method == 'POST':
         manager = Manager.login(request.form.get('id_worker'), request.form.get('password'))
@@ -349,7 +451,7 @@ def manager_login_page():
     return render_template('manager_login.html')
 
 """Terminates the current user session and clears all stored authentication data before redirecting to the landing page"""
-@app.route('/logout')
+@route('/logout')
 def logout():
     session.clear()
     return redirect(url_for('home_page'))
@@ -357,7 +459,8 @@ def logout():
 # --- Section 3: Customer Actions ---
 
 """Retrieves and displays categorized booking history for both registered members and guest users"""
-@app.route('/my-bookings', methods=['GET', 'POST'])
+@route('/my-bookings', methods=['GET', 'POST'])
+@reads_own_writes
 def view_bookings():
     now = datetime.now()
 
@@ -384,16 +487,24 @@ def view_bookings():
 
     user_email = session.get('email')
     if user_email:
-        conf, comp, c_you, c_sys = Booking.get_user_bookings(user_email)
-        return render_template('booking_results.html',
-                               confirmed=conf, completed=comp,
-                               cancelled_by_you=c_you, cancelled_by_system=c_sys,
-                               is_guest=False, now=now)
+        history = Booking.get_user_bookings_page(user_email, request.args.get('tab', 'Confirmed'),
+                                                 request.args.get('page', 1, type=int),
+                                                 include_archive=request.args.get('archive') == '1')
+        return render_template('booking_results.html', history=history, is_guest=False, now=now)
 
     return render_template('search_bookings.html')
 
+"""Returns the passenger details of one of the logged-in user's bookings, loaded when the booking is expanded"""
+@route("/api/bookings/<int:booking_id>/tickets")
+@reads_own_writes
+def booking_tickets_api(booking_id):
+    user_email = session.get('email')
+    if not user_email:
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify(Booking.get_booking_tickets(user_email, booking_id, request.args.get('archive') == '1'))
+
 """Handles the cancellation of an existing booking and provides a status update to the customer"""
-@app.route("/cancel-booking", methods=["POST"])
+@route("/cancel-booking", methods=["POST"])
 def cancel_booking():
     booking_id = request.form.get('id_booking')
 
@@ -402,6 +513,8 @@ def cancel_booking():
         return redirect(url_for('view_bookings'))
 
     success, message = Booking.cancel_by_customer(booking_id)
+    if success:
+        mark_session_write()
     flash(message, "success" if success else "error")
 
     return redirect(url_for('view_bookings'))
@@ -409,7 +522,7 @@ def cancel_booking():
 # --- Section 4: Management ---
 
 """Displays the administrative dashboard with real-time flight and route data for authorized managers"""
-@app.route('/manager/dashboard')
+@route('/manager/dashboard')
 def manager_dashboard():
     if session.get('role') != 'manager':
         return redirect(url_for('manager_login_page'))
@@ -419,7 +532,7 @@ def manager_dashboard():
     return render_template('manager_dashboard.html', flights=flights, form_data={'routes': routes})
 
 """Provides a secure API endpoint for real-time validation of aircraft and crew availability, ensuring operational feasibility before a flight is scheduled"""
-@app.route("/api/check_availability", methods=['POST'])
+@route("/api/check_availability", methods=['POST'])
 def check_availability_api():
     if session.get("role") != "manager":
         return jsonify({"can_proceed": False, "error_msg": "Unauthorized"}), 403
@@ -435,7 +548,7 @@ def check_availability_api():
     return jsonify(response)
 
 """Processes a POST request to create a new flight after verifying manager authorization and collecting route, aircraft, crew, and pricing details"""
-@app.route("/manager/add_flight", methods=['POST'])
+@route("/manager/add_flight", methods=['POST'])
 def add_flight():
     if session.get("role") != "manager":
         return redirect(url_for('manager_login_page'))
@@ -463,7 +576,7 @@ def add_flight():
     return redirect(url_for('manager_dashboard'))
 
 """Schedules a new flight by committing assigned resources and pricing data to the database"""
-@app.route("/manager/cancel_flight", methods=["POST"])
+@route("/manager/cancel_flight", methods=["POST"])
 def manager_cancel_flight_route():
     if session.get("role") != "manager":
         flash("Unauthorized access.", "error")
@@ -473,14 +586,120 @@ def manager_cancel_flight_route():
     if not flight_id:
         flash("Missing flight ID.", "error")
         return redirect(url_for("manager_dashboard"))
+    try:
+        flight_id = int(flight_id)
+    except ValueError:
+        flash("Invalid flight ID.", "error")
+        return redirect(url_for("manager_dashboard"))
 
-    success, message = Manager.cancel_flight(flight_id)
+    job_id = Manager.queue_job('cancel_flight', {'flight_id': flight_id}, session.get('user_id'))
 
-    flash(message, "success" if success else "error")
+    flash(f"Cancellation of flight #{flight_id} queued (job #{job_id}). Passengers will be notified.", "success")
     return redirect(url_for("manager_dashboard"))
 
+"""Cancels many flights at once (selected IDs or a route/date/plane filter), answering JSON callers with the counts and form posts with a flash message"""
+@route("/manager/bulk_cancel", methods=["POST"])
+def manager_bulk_cancel_route():
+    is_json = request.is_json
+    if session.get("role") != "manager":
+        if is_json:
+            return jsonify({"success": False, "error_msg": "Unauthorized"}), 403
+        flash("Unauthorized access.", "error")
+        return redirect(url_for("manager_login_page"))
+
+    if is_json:
+        data = request.get_json() or {}
+        flight_ids = data.get('flight_ids') or []
+    else:
+        data = request.form
+        flight_ids = request.form.getlist('flight_ids')
+
+    try:
+        flight_ids = [int(fid) for fid in flight_ids if str(fid).strip()]
+    except ValueError:
+        if is_json:
+            return jsonify({"success": False, "error_msg": "Invalid flight ID."}), 400
+        flash("Bulk cancellation failed: invalid flight ID.", "error")
+        return redirect(url_for("manager_dashboard"))
+    filters = {key: data.get(key) or None for key in ('route_id', 'date_from', 'date_to', 'plane_id')}
+
+    if is_json:
+        success, result = Manager.cancel_flights_bulk(flight_ids, **filters)
+        if success:
+            return jsonify({"success": True, **result})
+        return jsonify({"success": False, "error_msg": result}), 400
+
+    if not flight_ids and not any(filters.values()):
+        flash("Select flights or at least one filter.", "error")
+        return redirect(url_for("manager_dashboard"))
+    job_id = Manager.queue_job('bulk_cancel', {'flight_ids': flight_ids, **filters}, session.get('user_id'), max_attempts=1)
+    flash(f"Bulk cancellation queued (job #{job_id}). Flights departing within {CANCEL_NOTICE_HOURS} hours are skipped; "
+          f"the job result lists them.", "success")
+    return redirect(url_for("manager_dashboard"))
+
+"""Reports the status, progress and result of a queued background job so managers can poll long-running operations"""
+@route("/api/jobs/<int:job_id>")
+def job_status_api(job_id):
+    if session.get("role") != "manager":
+        return jsonify({"error": "Unauthorized"}), 403
+    job = Manager.get_job_status(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+"""Serves a manager report (load factor, revenue by month, cancellation rates, crew utilization) from the in-memory analytics snapshot"""
+@route("/api/reports/<name>")
+def reports_api(name):
+    if session.get("role") != "manager":
+        return jsonify({"error": "Unauthorized"}), 403
+    if name not in REPORTS:
+        return jsonify({"error": "Unknown report"}), 404
+    kwargs = {}
+    if name == 'crew_utilization':
+        kwargs['days'] = request.args.get('days', 30, type=int)
+    return jsonify(analytics.report(name, **kwargs))
+
+"""Reports execution counts, prepares and latency of the prepared hot statements so managers can watch the busiest lookups"""
+@route("/api/statement-stats")
+def statement_stats_api():
+    if session.get("role") != "manager":
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify(db.statement_stats())
+
+"""Streams a manager export (flight manifest, bookings by date, revenue by route) as CSV or JSON lines without loading it into memory"""
+@route("/manager/export/<report>")
+def manager_export(report):
+    if session.get("role") != "manager":
+        return redirect(url_for("manager_login_page"))
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_MIMETYPES:
+        return jsonify({"error": "Unsupported format"}), 400
+    date_from = request.args.get('date_from') or None
+    date_to = request.args.get('date_to') or None
+    period = f"{date_from or 'start'}_{date_to or 'now'}"
+    include_archive = request.args.get('include_archive') == '1'
+
+    if report == 'manifest':
+        flight_id = request.args.get('flight_id', type=int)
+        if not flight_id:
+            return jsonify({"error": "Missing flight_id"}), 400
+        rows = db.iter_flight_manifest(flight_id, include_archive)
+        filename = f"manifest_flight_{flight_id}.{fmt}"
+    elif report == 'bookings':
+        rows = db.iter_bookings_by_date(date_from, date_to, include_archive)
+        filename = f"bookings_{period}.{fmt}"
+    elif report == 'revenue':
+        rows = db.iter_revenue_by_route(date_from, date_to, include_archive)
+        filename = f"revenue_by_route_{period}.{fmt}"
+    else:
+        return jsonify({"error": "Unknown report"}), 404
+
+    return Response(stream_with_context(stream_rows(rows, fmt)), mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
 """Processes comprehensive flight cancellations and updates all related booking statuses in the system"""
-@app.route('/manager/manage-aircraft')
+@route('/manager/manage-aircraft')
 def manage_aircraft():
     if session.get('role') != 'manager':
         return redirect(url_for('manager_login_page'))
@@ -500,8 +719,26 @@ def manage_aircraft():
                            edit_type=edit_type,
                            add_type=add_type)
 
+"""Returns a paginated, optionally filtered listing of pilots, attendants or aircraft for the management interface"""
+@route('/api/resources/<resource_type>')
+def resources_api(resource_type):
+    if session.get('role') != 'manager':
+        return jsonify({"error": "Unauthorized"}), 403
+    if resource_type not in ('pilot', 'attendant', 'aircraft'):
+        return jsonify({"error": "Unknown resource type"}), 404
+
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = min(max(int(request.args.get('per_page', 25)), 1), 200)
+    except ValueError:
+        return jsonify({"error": "Invalid page"}), 400
+    long_flights = request.args.get('long_flights')
+    if long_flights is not None:
+        long_flights = long_flights in ('1', 'true', 'yes')
+    return jsonify(Manager.get_resources_page(resource_type, page, per_page, long_flights, request.args.get('size')))
+
 """Processes form data to add or update pilots, attendants, and aircraft records in the system"""
-@app.route('/manager/save_resource', methods=['POST'])
+@route('/manager/save_resource', methods=['POST'])
 def save_resource():
     if 'user_id' not in session or session.get('role') != 'manager':
         return redirect('/')
@@ -512,7 +749,12 @@ def save_resource():
     print(f"--- Action: {mode} {resource_type} ---")
 
     success = False
-    if mode == 'add':
+    if mode == 'add' and resource_type == 'aircraft':
+        job_id = Manager.queue_job('add_resource', {'resource_type': resource_type, 'form': request.form.to_dict()},
+                                   session.get('user_id'), max_attempts=1)
+        flash(f"Aircraft creation queued (job #{job_id}). Seats are being generated in the background.", "success")
+        return redirect(url_for('manage_aircraft'))
+    elif mode == 'add':
         success = Manager.add_new_resource(resource_type, request.form)
     elif mode == 'edit':
         success = Manager.update_existing_resource(resource_type, request.form)
@@ -523,5 +765,18 @@ def save_resource():
         flash("Error saving resource. Check ID or duplicates.", "error")
     return redirect(url_for('manage_aircraft'))
 
+"""Builds the Flask application without touching the database"""
+def create_app(config=None):
+    app = Flask(__name__)
+    app.secret_key = os.environ.get('FLYTAU_SECRET_KEY', 'flytau_secret_key')
+    app.config.update(config or {})
+    for rule, options, view in ROUTES:
+        app.add_url_rule(rule, view_func=view, **options)
+    app.before_request(start_background_workers)
+    app.teardown_request(release_db_connection)
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
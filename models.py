@@ -1,9 +1,56 @@
-from database import Database
+from database import Database, BOOKING_TABS, CANCEL_NOTICE_HOURS, FANOUT_WORKERS, after_fork
 from datetime import datetime, timedelta
-from utils import prepare_flights_for_view, _format_datetime
+from concurrent.futures import ThreadPoolExecutor
+from utils import prepare_flights_for_view, _format_datetime, _format_price, departure_bucket
+from cache import TTLCache, SingleFlight, cached_call
+from fare_matrix import fare_matrix
+from connections import timetable
+from registry import resource_registry
+from jobs import job_queue
+from resilience import CircuitBreaker, CircuitOpenError, LastGoodCache
+import mysql.connector
+from mysql.connector import pooling
 
 db = Database()
 
+BOOKINGS_PER_PAGE = 10
+
+def _init_process_state():
+    """Creates the per-process caches, circuit breakers and fan-out pool; run again after a fork"""
+    global availability_cache, availability_flight, search_breaker, availability_breaker, last_good_searches, search_pool
+    availability_cache = TTLCache(ttl=30)
+    availability_flight = SingleFlight()
+    # An exhausted connection pool is local back-pressure, not a sign the database is failing, so it never opens a circuit
+    search_breaker = CircuitBreaker('search', failures=(mysql.connector.Error,), ignored=(pooling.PoolError,))
+    availability_breaker = CircuitBreaker('availability', failures=(mysql.connector.Error,), ignored=(pooling.PoolError,))
+    last_good_searches = LastGoodCache()
+    # Independent lookups of one search page run side by side, each worker on its own pooled connection (released after every task)
+    search_pool = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='search-fanout')
+
+_init_process_state()
+after_fork(_init_process_state)
+
+def _on_own_connection(fn, *args):
+    try:
+        return fn(*args)
+    finally:
+        db.release_connection()
+
+def fan_out(fn, *args):
+    return search_pool.submit(_on_own_connection, fn, *args)
+
+def empty_search_page(unavailable=False):
+    return {'outbound_flights': [], 'return_flights': [], 'round_trip_pairs': [],
+            'suggested_dates': {"outbound": None, "return": None},
+            'fare_calendar': {"outbound": [], "return": []}, 'stale': False, 'unavailable': unavailable}
+
+def _invalidate_availability(event, ids):
+    # New flights take planes and crew, cancellations free them, and added or edited resources change who qualifies
+    if event.startswith(('flight_', 'resource_')):
+        availability_cache.clear()
+
+db.add_change_listener(_invalidate_availability)
+
 # --- Section 1: Booking Lifecycle ---
 
 class Flight:
@@ -26,6 +73,138 @@ class Flight:
         raw_flights = db.get_flight_data(date_str=date, origin=origin, destination=destination)
         return prepare_flights_for_view(raw_flights)
 
+    """Loads everything the search page shows, falling back to the last good results while the database fails"""
+    @staticmethod
+    def search_page(origin, destination, date, return_date=None, trip_type=None):
+        round_trip = trip_type == 'round' and bool(return_date)
+
+        def load():
+            # Everything that does not depend on another result starts at once; the round-trip pairing query is
+            # independent too (it finds nothing when either direction is empty), so it is not held back
+            outbound = fan_out(Flight.search, date, origin, destination)
+            outbound_calendar = fan_out(Flight.fare_calendar, origin, destination, date)
+            if round_trip:
+                inbound = fan_out(Flight.search, return_date, destination, origin)
+                inbound_calendar = fan_out(Flight.fare_calendar, destination, origin, return_date)
+                pairs = fan_out(Flight.search_round_trip, date, return_date, origin, destination)
+
+            results = {'outbound_flights': outbound.result(),
+                       'return_flights': [],
+                       'round_trip_pairs': [],
+                       'suggested_dates': {"outbound": None, "return": None},
+                       'fare_calendar': {"outbound": outbound_calendar.result(), "return": []}}
+            if not results['outbound_flights']:
+                results['suggested_dates']["outbound"] = db.get_nearest_flight_date(origin, destination, date)
+
+            if round_trip:
+                results['return_flights'] = inbound.result()
+                results['fare_calendar']["return"] = inbound_calendar.result()
+                if results['outbound_flights'] and results['return_flights']:
+                    results['round_trip_pairs'] = pairs.result()
+
+                if not results['return_flights']:
+                    # בודקים אחרי תאריך ההמראה (הלוך)
+                    base_date = results['suggested_dates']["outbound"] or date
+                    results['suggested_dates']["return"] = db.get_nearest_flight_date(destination, origin, base_date, after=True)
+            return results
+
+        key = ('search_page', origin, destination, date, return_date if trip_type == 'round' else None)
+        try:
+            results, stale = last_good_searches.call(key, load, search_breaker)
+        except (CircuitOpenError, mysql.connector.Error) as e:
+            print(f"Search unavailable: {e}")
+            return empty_search_page(unavailable=True)
+        return {**results, 'stale': stale, 'unavailable': False}
+
+    """Returns the top-K valid outbound/return combinations for a round trip, ranked by combined price and trip length by the database in a single query"""
+    @staticmethod
+    def search_round_trip(date, return_date, origin, destination, top_k=10):
+        pairs = db.get_round_trip_pairs(origin, destination, date, return_date, top_k)
+        for p in pairs:
+            p['outbound_departure_display'] = _format_datetime(p['outbound_departure'])
+            p['outbound_arrival_display'] = _format_datetime(p['outbound_arrival'])
+            p['return_departure_display'] = _format_datetime(p['return_departure'])
+            p['return_arrival_display'] = _format_datetime(p['return_arrival'])
+            p['total_display'] = _format_price(p['total_price'])
+            p['trip_length_display'] = f"{p['trip_minutes'] // 1440}d {p['trip_minutes'] % 1440 // 60}h"
+        return pairs
+
+    """Builds a day-by-day lowest-fare grid for a route, either ±days around a center date or for a whole month, from one aggregated query"""
+    @staticmethod
+    def fare_calendar(origin, destination, center_date=None, days=3, month=None):
+        today = datetime.now().date()
+        try:
+            if month:
+                start = datetime.strptime(month, '%Y-%m').date()
+                end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+            else:
+                center = datetime.strptime(center_date, '%Y-%m-%d').date() if center_date else today
+                start = center - timedelta(days=days)
+                end = center + timedelta(days=days)
+        except ValueError as e:
+            print(f"Invalid fare calendar date: {e}")
+            return []
+        start = max(start, today)
+        if end < start:
+            return []
+
+        fares = {row['flight_date']: row for row in db.get_fare_calendar(origin, destination, start, end)}
+        calendar = []
+        day = start
+        while day <= end:
+            row = fares.get(day)
+            calendar.append({
+                'date': day.strftime('%Y-%m-%d'),
+                'label': day.strftime('%a %d %b'),
+                'min_price': float(row['min_price']) if row else None,
+                'price_display': _format_price(row['min_price']) if row else "—",
+                'flights_count': row['flights_count'] if row else 0,
+                'is_selected': center_date == day.strftime('%Y-%m-%d')
+            })
+            day += timedelta(days=1)
+        return calendar
+
+    """Loads the fare calendars for both directions of a route, falling back to the last good ones while the database fails"""
+    @staticmethod
+    def fare_calendar_pair(origin, destination, date=None, return_date=None, days=3, month=None, round_trip=False):
+        def load():
+            outbound = fan_out(Flight.fare_calendar, origin, destination, date, days, month)
+            inbound = None
+            if return_date or (month and round_trip):
+                inbound = fan_out(Flight.fare_calendar, destination, origin, return_date, days, month)
+            return {"outbound": outbound.result(), "return": inbound.result() if inbound else []}
+
+        key = ('fare_calendar', origin, destination, date, return_date, days, month, round_trip)
+        try:
+            result, stale = last_good_searches.call(key, load, search_breaker)
+        except (CircuitOpenError, mysql.connector.Error) as e:
+            print(f"Fare calendar unavailable: {e}")
+            return {"outbound": [], "return": [], "stale": False, "unavailable": True}
+        return {**result, "stale": stale, "unavailable": False}
+
+    """Lists the cheapest fare to every reachable destination from an origin within a date window, answered from the in-memory fare matrix"""
+    @staticmethod
+    def explore(origin, start_date, end_date=None, days=7):
+        start = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else start + timedelta(days=days)
+        results = fare_matrix.cheapest_by_destination(origin, start, end)
+        for r in results:
+            r['price_display'] = _format_price(r['min_price'])
+        return results
+
+    """Finds connecting itineraries with one or two stops from the in-memory timetable, formatting each leg and the totals for display"""
+    @staticmethod
+    def search_connections(date, origin, destination, max_stops=2, min_connection_minutes=60, max_duration_hours=30, limit=20):
+        itineraries = timetable.search(origin, destination, date, max_stops,
+                                       timedelta(minutes=min_connection_minutes),
+                                       timedelta(hours=max_duration_hours), limit)
+        for it in itineraries:
+            it['legs'] = prepare_flights_for_view([dict(leg, min_price=leg['price']) for leg in it['legs']])
+            it['departure_display'] = _format_datetime(it['departure_time'])
+            it['arrival_display'] = _format_datetime(it['arrival_time'])
+            it['price_display'] = _format_price(it['total_price'])
+        return itineraries
+
 """Represents an aircraft entity, storing manufacturer details and providing methods to retrieve seat-map dimensions for specific cabin classes"""
 class Plane:
     def __init__(self, id_plane, manufacturer, purchase_date):
@@ -125,47 +304,40 @@ class Customer(User):
             return False, str(e)
 
 class Booking:
-    """Consolidates raw ticket data into organized booking records and categorizes them by status and departure time to provide a structured itinerary history for the user"""
+    """Returns one page of a registered user's booking history for a status tab, with per-tab counts; ticket details are loaded separately on demand and archived bookings are included only when asked for"""
     @staticmethod
-    def get_user_bookings(email):
-        raw_data = db.get_customer_bookings(email)
-        bookings_dict = {}
-        for row in raw_data:
-            bid = row['id_booking']
-            if bid not in bookings_dict:
-                bookings_dict[bid] = {
-                    'info': {
-                        'id_booking': bid,
-                        'booking_status': row['booking_status'],
-                        'departure_time': row['departure_time'],
-                        'origin': row['origin_city'],
-                        'destination': row['destination_city'],
-                        'total_price': row['total_price']
-                    },
-                    'tickets': []
-                }
-            bookings_dict[bid]['tickets'].append({
-                'name': row['passenger_name'],
-                'seat': f"{row['row_number']}{row['seat_letter']}",
-                'class': row['class_type']
-            })
-        now = datetime.now()
-        confirmed, completed, cancelled_you, cancelled_sys = [], [], [], []
-        for b in bookings_dict.values():
-            status = b['info']['booking_status']
-            dep_time = b['info']['departure_time']
-            if status == 'Confirmed':
-                if dep_time > now:
-                    confirmed.append(b)
-                else:
-                    completed.append(b)
-            elif status == 'Completed':
-                completed.append(b)
-            elif status == 'Cancelled_Client':
-                cancelled_you.append(b)
-            elif status == 'Cancelled_System':
-                cancelled_sys.append(b)
-        return confirmed, completed, cancelled_you, cancelled_sys
+    def get_user_bookings_page(email, tab='Confirmed', page=1, per_page=BOOKINGS_PER_PAGE, include_archive=False):
+        if tab not in BOOKING_TABS:
+            tab = 'Confirmed'
+        counts = db.get_customer_booking_counts(email, include_archive)
+        pages = max((counts[tab] + per_page - 1) // per_page, 1)
+        page = min(max(int(page), 1), pages)
+        rows = db.get_customer_bookings_page(email, tab, (page - 1) * per_page, per_page, include_archive)
+        return {
+            'tab': tab,
+            'include_archive': include_archive,
+            'counts': counts,
+            'page': page,
+            'pages': pages,
+            'bookings': [{'info': {
+                'id_booking': row['id_booking'],
+                'booking_status': row['booking_status'],
+                'departure_time': row['departure_time'],
+                'origin': row['origin_city'],
+                'destination': row['destination_city'],
+                'total_price': row['total_price'],
+                'passengers': row['passengers']
+            }} for row in rows]
+        }
+
+    """Lists the passengers and seats of one of the user's bookings"""
+    @staticmethod
+    def get_booking_tickets(email, booking_id, include_archive=False):
+        return [{
+            'name': row['passenger_name'],
+            'seat': f"{row['row_number']}{row['seat_letter']}",
+            'class': row['class_type']
+        } for row in db.get_booking_tickets(email, booking_id, include_archive)]
 
     """Retrieves the complete details of a single booking by its unique ID and associated email, returning a structured record or None if no match is found"""
     @staticmethod
@@ -196,23 +368,13 @@ class Booking:
     @staticmethod
     def organize_bookings(bookings_list):
         confirmed, completed, cancelled_you, cancelled_sys = [], [], [], []
-        now = datetime.now()
 
         for b in bookings_list:
             info = b.get('info', b)
 
             status = info.get('booking_status')
-            dep_time = info.get('departure_time')
-            if isinstance(dep_time, str):
-                try:
-                    dep_time = datetime.strptime(dep_time, '%Y-%m-%d %H:%M:%S')
-                except ValueError:
-                    pass
             if status == 'Confirmed':
-                if dep_time and dep_time > now:
-                    confirmed.append(b)
-                else:
-                    completed.append(b)
+                confirmed.append(b)
             elif status == 'Completed':
                 completed.append(b)
             elif status == 'Cancelled_Client':
@@ -261,9 +423,32 @@ class Manager(User):
     def cancel_flight(flight_id):
         return db.cancel_flight_full_logic(flight_id)
 
+    """Cancels a set of flights (explicit IDs and/or a route, date range or plane filter) in a single transaction and reports how many bookings were affected"""
+    @staticmethod
+    def cancel_flights_bulk(flight_ids=None, route_id=None, date_from=None, date_to=None, plane_id=None):
+        success, result = db.cancel_flights_bulk(flight_ids, route_id, date_from, date_to, plane_id)
+        if success and result['flight_ids']:
+            result['notify_job'] = job_queue.submit('notify_cancellation', {'flight_ids': result['flight_ids']})
+        return success, result
+
+    """Queues long-running administrative work (flight cancellations, aircraft creation) on the background worker pool and returns the job ID immediately"""
+    @staticmethod
+    def queue_job(job_type, payload, manager_id=None, max_attempts=3):
+        return job_queue.submit(job_type, payload, max_attempts=max_attempts, created_by=manager_id)
+
+    @staticmethod
+    def get_job_status(job_id):
+        return job_queue.status(job_id)
+
     @staticmethod
     def validate_resources(dept_time, route_id):
-        result = db.get_available_resources(dept_time, route_id)
+        key = (str(route_id), departure_bucket(dept_time))
+        try:
+            result = cached_call(availability_cache, availability_flight, key,
+                                 lambda: availability_breaker.call(db.get_available_resources, dept_time, route_id))
+        except (CircuitOpenError, mysql.connector.Error) as e:
+            print(f"Error checking availability: {e}")
+            return None
         if not result:
             return None
         v_planes = [p for p in result.get('planes', []) if p.get('is_valid')]
@@ -301,15 +486,17 @@ class Manager(User):
     @staticmethod
     def get_dashboard_data():
         flights = db.get_all_flights_for_manager()
+        crew = {}
+        for member in db.get_all_flight_crew():
+            crew.setdefault((member.id_flight, member.role), []).append(member.full_name)
         now = datetime.now()
         for f in flights:
-            f['formatted_date'] = _format_datetime(f['departure_time'])
-            crew = db.get_flight_crew_names(f['id_flight'])
-            f['pilots_list'] = ", ".join(crew['pilots'])
-            f['attendants_list'] = ", ".join(crew['attendants'])
-            time_diff = f['departure_time'] - now
-            f['can_cancel'] = (f['flight_status'] == 'Scheduled' and
-                               time_diff.total_seconds() > 72 * 3600)
+            f.formatted_date = _format_datetime(f.departure_time)
+            f.pilots_list = ", ".join(crew.get((f.id_flight, 'Pilot'), []))
+            f.attendants_list = ", ".join(crew.get((f.id_flight, 'Attendant'), []))
+            time_diff = f.departure_time - now
+            f.can_cancel = (f.flight_status == 'Scheduled' and
+                            time_diff.total_seconds() > CANCEL_NOTICE_HOURS * 3600)
 
         routes = db.get_routes_only()
         return flights, routes
@@ -326,32 +513,30 @@ class Manager(User):
     """Retrieves a complete inventory of all operational assets—including pilots, flight attendants, and aircraft—providing a centralized data source for administrative management"""
     @staticmethod
     def get_all_resources():
-        return {
-            'pilots': db.get_all_pilots(),
-            'attendants': db.get_all_flight_attendants(),
-            'planes': db.get_all_planes()
-        }
+        return resource_registry.all_resources()
 
     """Facilitates the expansion of operational capacity by processing form-submitted data to register new pilots, flight attendants, or aircraft within the organizational database"""
     @staticmethod
     def add_new_resource(resource_type, form_data):
-        return db.add_resource(resource_type, form_data)
+        success = db.add_resource(resource_type, form_data)
+        if success:
+            resource_registry.invalidate()
+        return success
 
     """Enables the modification of existing airline assets by processing updated form data to refresh pilot, attendant, or aircraft records within the centralized database"""
     @staticmethod
     def update_existing_resource(resource_type, form_data):
-        return db.update_resource(resource_type, form_data)
+        success = db.update_resource(resource_type, form_data)
+        if success:
+            resource_registry.invalidate()
+        return success
 
     """Identifies and retrieves a specific operational resource by its unique identifier, enabling precise data editing and record management within the administrative interface"""
     @staticmethod
     def get_single_resource(resource_type, resource_id):
-        all_data = Manager.get_all_resources()
-        target_list = all_data.get(resource_type + 's', [])
-        if resource_type == 'aircraft':
-            target_list = all_data.get('planes', [])
-
-        id_key = 'id_plane' if resource_type == 'aircraft' else 'id_worker'
-        for item in target_list:
-            if str(item[id_key]) == str(resource_id):
-                return item
-        return None
+        return resource_registry.get(resource_type, resource_id)
+
+    """Returns one page of pilots, attendants or aircraft, optionally filtered by long-haul qualification or plane size"""
+    @staticmethod
+    def get_resources_page(resource_type, page=1, per_page=25, long_flights=None, size=None):
+        return resource_registry.page(resource_type, page, per_page, long_flights, size)
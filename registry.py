@@ -0,0 +1,64 @@
+import threading
+from database import Database, after_fork
+from cache import TTLCache
+
+db = Database()
+
+LISTING_KEYS = {'pilot': 'pilots', 'attendant': 'attendants', 'aircraft': 'planes'}
+
+class ResourceRegistry:
+    """Pilots, attendants and aircraft indexed by ID, built from cached full listings that are invalidated whenever a record is saved; filtered pages by long-haul qualification or plane size are read from the database"""
+    def __init__(self, ttl=300):
+        self._listings = TTLCache(ttl=ttl)
+        self._lock = threading.Lock()
+        self._indexes = {}   # res_type -> (listing, {id: row})
+
+    def _load(self, res_type):
+        listing = self._listings.get(res_type)
+        if listing is None:
+            generation = self._listings.generation
+            if res_type == 'pilot':
+                listing = db.get_all_pilots()
+            elif res_type == 'attendant':
+                listing = db.get_all_flight_attendants()
+            else:
+                listing = db.get_all_planes()
+            self._listings.set(res_type, listing, generation)
+
+        with self._lock:
+            cached = self._indexes.get(res_type)
+            if cached is None or cached[0] is not listing:
+                id_key = 'id_plane' if res_type == 'aircraft' else 'id_worker'
+                cached = (listing, {str(row[id_key]): row for row in listing})
+                self._indexes[res_type] = cached
+        return cached
+
+    def listing(self, res_type):
+        return self._load(res_type)[0]
+
+    def all_resources(self):
+        return {key: self.listing(res_type) for res_type, key in LISTING_KEYS.items()}
+
+    def get(self, res_type, res_id):
+        """Direct lookup by ID: served from the cached index when warm, otherwise a single primary-key query"""
+        if res_type not in LISTING_KEYS:
+            return None
+        if self._listings.get(res_type) is not None:
+            return self._load(res_type)[1].get(str(res_id))
+        return db.get_resource_by_id(res_type, res_id)
+
+    def page(self, res_type, page=1, per_page=25, long_flights=None, size=None):
+        """One page of a resource listing, read straight from the database so large fleets never load in full"""
+        page = max(int(page), 1)
+        rows, total = db.get_resources_page(res_type, (page - 1) * per_page, per_page, long_flights, size)
+        return {'items': rows, 'page': page, 'per_page': per_page, 'total': total,
+                'pages': (total + per_page - 1) // per_page}
+
+    def invalidate(self):
+        self._listings.clear()
+        with self._lock:
+            self._indexes.clear()
+
+resource_registry = ResourceRegistry()
+# A forked worker starts with empty listings and fresh locks
+after_fork(resource_registry.__init__)
@@ -0,0 +1,85 @@
+import threading
+import time
+
+class CircuitOpenError(Exception):
+    """Raised instead of running a call while its circuit breaker is open"""
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures and fails calls fast until a trial call succeeds"""
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, failures=(Exception,), ignored=()):
+        self.name = name
+        self.failures = failures
+        self.ignored = ignored
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return 'open'
+            return 'half-open'
+
+    def _admit(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            self._trial_running = True
+
+    def call(self, fn, *args, **kwargs):
+        self._admit()
+        try:
+            result = fn(*args, **kwargs)
+        except self.ignored:
+            with self._lock:
+                self._trial_running = False
+            raise
+        except self.failures:
+            with self._lock:
+                self._failures += 1
+                self._trial_running = False
+                if self._opened_at is not None or self._failures >= self.failure_threshold:
+                    self._opened_at = time.monotonic()
+            raise
+        except BaseException:
+            with self._lock:
+                self._trial_running = False
+            raise
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+        return result
+
+class LastGoodCache:
+    """Keeps the last successful result per key to serve while the source is failing"""
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def call(self, key, fn, breaker):
+        """Returns (value, stale): a fresh result, or the last good one when the call fails"""
+        try:
+            value = breaker.call(fn)
+        except (CircuitOpenError, *breaker.failures) as e:
+            with self._lock:
+                entry = self._data.get(key)
+            if entry is None:
+                raise
+            print(f"Serving last good result for {key!r} ({breaker.name}): {e}")
+            return entry, True
+        with self._lock:
+            self._data.pop(key, None)
+            if len(self._data) >= self.max_entries:
+                del self._data[next(iter(self._data))]
+            self._data[key] = value
+        return value, False
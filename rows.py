@@ -0,0 +1,81 @@
+class Row:
+    """Result row stored in __slots__ instead of a per-row dict: attribute access for templates, plus the mapping methods (row['x'], get, keys, items, 'x' in row) the code written against dictionary cursors relies on"""
+    __slots__ = ()
+    fields = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+        for name in self.__slots__[len(values):]:
+            setattr(self, name, None)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(f"{type(self).__name__} has no field {key!r}") from None
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def values(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.__slots__]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, Row):
+            return type(self) is type(other) and self.values() == other.values()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in self.items())})"
+
+def row_class(name, fields, extra=()):
+    """Creates a Row subclass whose leading slots are the selected columns, in cursor order, followed by extra slots the application fills in later (display fields and the like)"""
+    fields = tuple(fields)
+    return type(name, (Row,), {'__slots__': fields + tuple(extra), 'fields': fields})
+
+FlightRow = row_class('FlightRow',
+                      ('id_flight', 'departure_time', 'arrival_time', 'flight_status', 'origin', 'destination', 'min_price'),
+                      extra=('departure_display', 'arrival_display', 'price_display'))
+
+ManagerFlightRow = row_class('ManagerFlightRow',
+                             ('id_flight', 'departure_time', 'landing_time', 'flight_status', 'origin_code',
+                              'origin_country', 'destination_code', 'destination_country', 'id_plane', 'plane_size',
+                              'passenger_count'),
+                             extra=('formatted_date', 'pilots_list', 'attendants_list', 'can_cancel'))
+
+BookingRow = row_class('BookingRow',
+                       ('id_booking', 'booking_date', 'booking_status', 'total_price', 'id_flight', 'departure_time',
+                        'origin_city', 'destination_city', 'passengers'))
+
+TicketRow = row_class('TicketRow', ('passenger_name', 'seat_letter', 'row_number', 'class_type'))
+
+CrewRow = row_class('CrewRow', ('id_flight', 'role', 'full_name'))
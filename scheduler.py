@@ -0,0 +1,95 @@
+import threading
+import time
+from database import Database, after_fork
+
+db = Database()
+
+TICK_SECONDS = 5
+# How often a process re-checks a task that another process ran recently
+CLAIM_CHECK_SECONDS = 60
+COMPLETION_INTERVAL_SECONDS = 300
+ARCHIVE_INTERVAL_SECONDS = 24 * 3600
+ARCHIVE_FIRST_DELAY_SECONDS = 3600
+
+SCHEDULED_TASKS = {}
+
+def scheduled_task(name, interval_seconds, first_delay_seconds=0):
+    """Registers the decorated function to run every interval_seconds across all processes, checked first_delay_seconds after start"""
+    def register(fn):
+        SCHEDULED_TASKS[name] = (interval_seconds, first_delay_seconds, fn)
+        return fn
+    return register
+
+class Scheduler:
+    """Single daemon thread running registered maintenance tasks at fixed intervals; each run is claimed in the database first, so only one of the worker processes performs it"""
+    def __init__(self, tick_seconds=TICK_SECONDS):
+        self.tick_seconds = tick_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._next_run = {}
+        self.last_results = {}
+
+    def start(self):
+        with self._lock:
+            if self._thread:
+                return
+            self._stop.clear()
+            now = time.monotonic()
+            for name, (_, first_delay, _) in SCHEDULED_TASKS.items():
+                self._next_run.setdefault(name, now + first_delay)
+            self._thread = threading.Thread(target=self._run, name="flytau-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread:
+            thread.join(timeout=5)
+
+    def run_now(self, name):
+        interval, _, fn = SCHEDULED_TASKS[name]
+        try:
+            self.last_results[name] = fn()
+        except Exception as e:
+            print(f"Scheduled task {name} failed: {e}")
+        finally:
+            db.release_connection()
+            self._next_run[name] = time.monotonic() + interval
+
+    def _run_if_claimed(self, name):
+        interval = SCHEDULED_TASKS[name][0]
+        try:
+            claimed = db.claim_scheduled_run(name, interval)
+        except Exception as e:
+            print(f"Could not claim scheduled task {name}: {e}")
+            claimed = False
+        finally:
+            db.release_connection()
+        if claimed:
+            self.run_now(name)
+        else:
+            self._next_run[name] = time.monotonic() + min(interval, CLAIM_CHECK_SECONDS)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for name in list(SCHEDULED_TASKS):
+                if self._next_run.get(name, 0) <= now:
+                    self._run_if_claimed(name)
+            self._stop.wait(self.tick_seconds)
+
+# --- Tasks ---
+
+@scheduled_task('complete_departed_bookings', COMPLETION_INTERVAL_SECONDS)
+def _complete_departed_bookings():
+    return db.complete_departed_bookings()
+
+@scheduled_task('archive_departed_flights', ARCHIVE_INTERVAL_SECONDS, ARCHIVE_FIRST_DELAY_SECONDS)
+def _archive_departed_flights():
+    return db.archive_departed_flights()
+
+scheduler = Scheduler()
+# The scheduler thread does not survive a fork: a forked process starts its own on its first request
+after_fork(scheduler.__init__)
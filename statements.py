@@ -0,0 +1,73 @@
+import threading
+import time
+import weakref
+import mysql.connector
+
+ER_UNKNOWN_STMT_HANDLER = 1243
+
+class StatementRegistry:
+    """Named hot statements prepared server-side once per pooled connection and re-executed with new parameters, so MySQL parses each of them once per connection instead of once per call; keeps per-statement execution stats"""
+    def __init__(self, statements):
+        self._sql = dict(statements)
+        self._cursors = weakref.WeakKeyDictionary()   # raw connection -> {name: prepared cursor}
+        self._lock = threading.Lock()
+        self._stats = {name: {'executions': 0, 'prepares': 0, 'errors': 0, 'rows': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+                       for name in self._sql}
+
+    def _cursor(self, conn, name):
+        raw = getattr(conn, '_cnx', conn)
+        with self._lock:
+            cursors = self._cursors.setdefault(raw, {})
+            cursor = cursors.get(name)
+            if cursor is None:
+                cursor = cursors[name] = conn.cursor(prepared=True)
+                self._stats[name]['prepares'] += 1
+        return cursor
+
+    def _discard(self, conn, name):
+        raw = getattr(conn, '_cnx', conn)
+        with self._lock:
+            cursor = self._cursors.get(raw, {}).pop(name, None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+
+    def execute(self, conn, name, params=()):
+        """Runs a registered statement on the given connection; returns (column names, list of row tuples). A statement handle the server no longer knows, e.g. after a reconnect, is prepared again once"""
+        started = time.perf_counter()
+        try:
+            try:
+                cursor = self._cursor(conn, name)
+                cursor.execute(self._sql[name], params)
+            except mysql.connector.Error as err:
+                if err.errno != ER_UNKNOWN_STMT_HANDLER:
+                    raise
+                self._discard(conn, name)
+                cursor = self._cursor(conn, name)
+                cursor.execute(self._sql[name], params)
+            rows = cursor.fetchall()
+            columns = tuple(cursor.column_names)
+        except Exception:
+            self._discard(conn, name)
+            with self._lock:
+                self._stats[name]['errors'] += 1
+            raise
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            stats = self._stats[name]
+            stats['executions'] += 1
+            stats['rows'] += len(rows)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        return columns, rows
+
+    def stats(self):
+        """Execution stats per statement: executions, times prepared, errors, rows returned and mean/max/total latency in ms"""
+        with self._lock:
+            return {name: {**s,
+                           'total_ms': round(s['total_ms'], 3),
+                           'max_ms': round(s['max_ms'], 3),
+                           'mean_ms': round(s['total_ms'] / s['executions'], 3) if s['executions'] else None}
+                    for name, s in self._stats.items()}
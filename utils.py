@@ -1,8 +1,11 @@
 from datetime import datetime
 from database import Database
+from rows import Row
 
 db = Database()
 
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
 #Converts a datetime value to a readable string format for display in HTML
 def _format_datetime(value):
     if value is None:
@@ -14,7 +17,8 @@ def _format_datetime(value):
             dt = datetime.strptime(str(value), "%Y-%m-%d %H:%M:%S")
         except ValueError:
             return str(value)
-    return dt.strftime("%d %b %Y, %H:%M")
+    # Same output as strftime("%d %b %Y, %H:%M") without parsing the format on every call
+    return f"{dt.day:02d} {_MONTHS[dt.month - 1]} {dt.year}, {dt.hour:02d}:{dt.minute:02d}"
 
 #Formats a price value as a dollar amount for display
 def _format_price(value):
@@ -26,16 +30,35 @@ def _format_price(value):
     except (ValueError, TypeError):
         return f"${value}"
 
-#Prepares flight data for display by formatting dates and prices
+#Prepares a whole result set for display at once: each distinct timestamp and price is formatted a single time; slotted rows get their display fields set in place, dictionary rows are copied with the fields merged in
 def prepare_flights_for_view(flights):
-    prepared = []
-    for f in flights or []:
-        f = dict(f)
-        f["departure_display"] = _format_datetime(f.get("departure_time"))
-        f["arrival_display"] = _format_datetime(f.get("arrival_time"))
-        f["price_display"] = _format_price(f.get("min_price"))
-        prepared.append(f)
-    return prepared
+    dates = {}
+    prices = {}
+
+    def fmt_date(value):
+        text = dates.get(value)
+        if text is None:
+            text = dates[value] = _format_datetime(value)
+        return text
+
+    def fmt_price(value):
+        text = prices.get(value)
+        if text is None:
+            text = prices[value] = _format_price(value)
+        return text
+
+    if flights and isinstance(flights[0], Row):
+        for f in flights:
+            f.departure_display = fmt_date(f.departure_time)
+            f.arrival_display = fmt_date(f.arrival_time)
+            f.price_display = fmt_price(f.min_price)
+        return list(flights)
+
+    return [{**f,
+             "departure_display": fmt_date(f.get("departure_time")),
+             "arrival_display": fmt_date(f.get("arrival_time")),
+             "price_display": fmt_price(f.get("min_price"))}
+            for f in flights or []]
 
 #Creates and returns a plane object with the correct dimensions based on the flight data
 def get_plane_object(flight_id):
@@ -102,6 +125,10 @@ def validate_seat_selection(selected_seats, flight_id):
             continue
     return conflicts
 
+#Normalizes a departure time string to a minute-level bucket ('YYYY-MM-DD HH:MM') used as a cache key
+def departure_bucket(value):
+    return str(value or "").replace('T', ' ').strip()[:16]
+
 #Calculates the next booking ID based on the last ID stored in the database
 def calculate_next_booking_id(last_id_from_db):
     if last_id_from_db is None: